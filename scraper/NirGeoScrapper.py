@@ -1,15 +1,41 @@
 import argparse
 import time
 import sys
-from google import scrape_google_maps, CONFIG
-from excel import ExcelWriter
-from utils import flatten_for_excel
+import os
+from google import (
+    scrape_google_maps,
+    scrape_failed,
+    SearchFailed,
+    browser_session,
+    prepare_page,
+    reset_pacer,
+    CONFIG,
+    PACER,
+    FIELD_REGISTRY,
+    PLACE_LATENCIES,
+    PLACE_BYTES,
+    TRAFFIC,
+)
+from google_async import scrape_google_maps_async, AsyncBrowserSession
+from excel import ExcelWriter, PlaceIndex, sanitize_name, load_shared_ids
+from journal import JournalWriter
+from utils import RowSchema, output_columns, place_id
+from shard import scrape_sharded
+from tiles import scrape_tiles, parse_bbox, TileState
+from frontier import Frontier
+from failures import FailureQueue
+from enrich import Enricher, HEAVY_FIELDS
+from store import PlaceStore
+from refresh import read_rows, refresh_places, RefreshState
+from formats import FORMATS, SinkSet, ParquetSink
+from metrics import timed, snapshot, write_json, PrometheusReporter
 import random
 import shutil
 import pyfiglet
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
+from rich.table import Table
 from rich.progress import (
     Progress,
     SpinnerColumn,
@@ -72,24 +98,8 @@ def print_banner():
 
 # ================= AVAILABLE FIELDS =================
 
-ALL_FIELDS = [
-    "Name",
-    "Category",
-    "Rating",
-    "Reviews Count",
-    "Address",
-    "Plus Code",
-    "Located In",
-    "Phone",
-    "Website",
-    "Open Status",
-    "Latitude",
-    "Longitude",
-    "Maps URL",
-    "Images",
-    "Star Breakdown",
-    "Reviewers",
-]
+# order and names come from the scraper's field registry
+ALL_FIELDS = list(FIELD_REGISTRY)
 
 def colorize_help(text: str) -> Text:
     styled = Text()
@@ -111,6 +121,585 @@ def colorize_help(text: str) -> Text:
     return styled
 
 
+def load_queries(path: str) -> list:
+
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#") and line not in queries:
+                queries.append(line)
+
+    return queries
+
+
+def open_session(args):
+    # one browser (and event loop for async) shared by every query
+    if args.engine == "async":
+        return AsyncBrowserSession()
+    return browser_session()
+
+
+def open_writer(query: str, args, store=None):
+
+    sinks = []
+    for fmt in args.format:
+        if fmt == "xlsx":
+            sinks.append(open_excel_writer(query, args, store))
+        elif fmt == "jsonl" and args.journal:
+            # the journal already is data/<query>.jsonl
+            continue
+        elif fmt == "parquet":
+            sinks.append(ParquetSink(query, row_group_size=args.row_group_size).open())
+        else:
+            sinks.append(FORMATS[fmt](query).open())
+
+    if len(sinks) == 1:
+        return sinks[0]
+
+    return SinkSet(sinks, batch_size=args.flush_every)
+
+
+def open_excel_writer(query: str, args, store=None):
+
+    # --store: rows go to the SQLite store, the .xlsx is exported from it
+    if store is not None:
+        return store.writer(query)
+
+    # --dedup-all: places saved by any other output file count as seen
+    shared_ids = None
+    if args.dedup_all:
+        own = os.path.join("data", f"{sanitize_name(query)}.xlsx")
+        shared_ids = load_shared_ids("data", exclude=[own])
+
+    if args.journal:
+        return JournalWriter(
+            query,
+            fsync_every=args.flush_every,
+            fsync_interval=args.flush_interval,
+            shared_ids=shared_ids
+        )
+
+    return ExcelWriter(
+        query,
+        flush_every=args.flush_every,
+        flush_interval=args.flush_interval,
+        shared_ids=shared_ids
+    )
+
+
+def output_schema(selected_fields, args) -> RowSchema:
+    # columns are fixed before the first row: ALL_FIELDS order, Images
+    # as Image 1..N only when selected
+    return RowSchema(scrape_fields_for(selected_fields), args.images)
+
+
+def scrape_fields_for(selected_fields) -> list:
+    # only these fields are ever queried from the page
+    return [
+        f for f in ALL_FIELDS
+        if f in selected_fields or f in ("Name", "Address", "Maps URL")
+    ]
+
+
+def run_query(
+    query, args, selected_fields, stats, progress, session, page=None, store=None
+) -> bool:
+
+    writer = open_writer(query, args, store)
+    skip = args.skip
+    known_ids = None
+
+    if args.resume and writer.headers:
+        selected_fields = [
+            f for f in selected_fields
+            if f in writer.headers
+            or (f == "Images" and any(h.startswith("Image ") for h in writer.headers))
+        ]
+
+        if not selected_fields:
+            console.print(
+                "[bold red][!] Resume failed[/]\n"
+                f"[yellow]None of the selected fields exist in {writer.path}.[/]\n"
+                "[dim]Use --list-fields or remove --resume[/]"
+            )
+            writer.close()
+            return False
+
+    if store is not None:
+        # fresh places in the store are never reopened, stale ones are
+        known_ids = writer.seen_ids
+
+    if args.resume and writer.seen_ids:
+        # saved places are recognised by their link, --skip still applies
+        # to the places that are not in the file yet
+        known_ids = writer.seen_ids
+        stats["skipped"] += writer.get_row_count()
+
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            f"[white]{len(known_ids)} saved places will not be reopened.[/]"
+        )
+
+    elif args.resume:
+        try:
+            existing_rows = writer.get_row_count()
+            stats["skipped"] += existing_rows
+
+            if args.skip > 0:
+                console.print(
+                    "[bold yellow][!][/bold yellow] "
+                    "[cyan]Info:[/] "
+                    "[white]--resume overrides --skip.[/]"
+                )
+
+            skip = max(args.skip, existing_rows)
+        except (FileNotFoundError, IOError):
+            pass
+
+    if writer.shared_ids:
+        known_ids = (
+            writer.shared_ids if known_ids is None
+            else known_ids.union(writer.shared_ids)
+        )
+
+    scrape_fields = scrape_fields_for(selected_fields)
+    schema = output_schema(selected_fields, args)
+    writer.set_columns(schema.columns)
+
+    # --enrich: heavy fields are left blank by the crawl and filled in
+    # by a separate pool that re-opens each saved place
+    enricher = None
+    enriched = {}
+    if args.enrich:
+        enrich_fields = [f for f in HEAVY_FIELDS if f in scrape_fields]
+        if enrich_fields:
+            scrape_fields = [f for f in scrape_fields if f not in enrich_fields]
+            enrich_columns = output_columns(enrich_fields, args.images)
+            enricher = Enricher(
+                os.path.splitext(writer.path)[0] + ".enrich",
+                enrich_fields,
+                args.enrich_workers
+            )
+
+    # links whose values wait in the writer for its next compaction
+    queued = []
+
+    def apply_enrichment(results, force=False):
+        # batches are queued in the writer and folded into its next
+        # rewrite of the file; a link is marked done once that happened
+        for url, place in results:
+            row = schema.record(place)
+            enriched[url] = {c: row[c] for c in enrich_columns}
+
+        if enriched and (force or len(enriched) >= args.enrich_batch):
+            writer.update_rows(
+                {place_id(url): values for url, values in enriched.items()}
+            )
+            queued.extend(enriched)
+            enriched.clear()
+
+        if queued and not writer.updates:
+            stats["enriched"] += len(queued)
+            enricher.mark_done(queued)
+            queued.clear()
+
+    frontier = None
+    if args.two_phase:
+        frontier = Frontier(os.path.splitext(writer.path)[0] + ".frontier")
+
+        # the frontier already knows which links were saved
+        if args.resume and frontier.done_count():
+            skip = args.skip
+
+    # places that could not be read, retried at the end and by --retry-failed
+    failures = FailureQueue(os.path.splitext(writer.path)[0] + ".failed.jsonl")
+
+    if args.retry_failed and not failures:
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            f"[white]No failed places queued for {query}.[/]"
+        )
+        failures.close()
+        writer.close()
+        return True
+
+    task = progress.add_task(
+        query,
+        total=args.total if args.total else None,
+        failed=0,
+        duplicates=0
+    )
+    saved = 0
+    duplicates = 0
+    places = None
+    ok = True
+
+    try:
+        if args.retry_failed:
+            places = scrape_failed(
+                failures,
+                fields=scrape_fields,
+                browser=session,
+                page=page
+            )
+        elif args.bbox:
+            state = TileState(
+                os.path.splitext(writer.path)[0] + ".tiles.json"
+            )
+
+            def on_tile(tile, depth, pending):
+                progress.update(
+                    task,
+                    description=f"{query} • tile depth {depth} • {pending} queued"
+                )
+
+            places = scrape_tiles(
+                query,
+                args.bbox,
+                grid=args.grid,
+                max_depth=args.max_depth,
+                state=state,
+                on_tile=on_tile,
+                two_phase=args.two_phase,
+                frontier=frontier,
+                known_ids=known_ids,
+                failures=failures,
+                automode=args.auto,
+                workers=args.workers,
+                fields=scrape_fields,
+                browser=session,
+                page=page
+            )
+        elif args.engine == "async":
+            places = session.iterate(scrape_google_maps_async(
+                search_query=query,
+                max_places=args.total,
+                skip=skip,
+                automode=args.auto,
+                browser=session.browser,
+                fields=scrape_fields,
+                page=page,
+                known_ids=known_ids,
+                failures=failures
+            ))
+        else:
+            places = scrape_google_maps(
+                search_query=query,
+                max_places=args.total,
+                skip=skip,
+                automode=args.auto,
+                workers=args.workers,
+                fields=scrape_fields,
+                browser=session,
+                page=page,
+                two_phase=args.two_phase,
+                frontier=frontier,
+                known_ids=known_ids,
+                failures=failures
+            )
+
+        for place in places:
+            stats["fetched"] += 1
+
+            with timed("flatten"):
+                row = schema.record(place)
+
+            if writer.write_row(row):
+                if enricher is not None:
+                    enricher.submit(place["Maps URL"])
+                    apply_enrichment(enricher.collect())
+
+                stats["saved"] += 1
+                progress.update(
+                    task,
+                    advance=1,
+                    description=f"[{THEME['success']}]✔[/] {place.get('Name', 'N/A')}"
+                )
+
+                saved += 1
+                if not args.auto and args.total and saved >= args.total:
+                    break
+
+            else:
+                stats["duplicates"] += 1
+                duplicates += 1
+
+                progress.update(
+                    task,
+                    duplicates=duplicates,
+                    description=f"[{THEME['warning']}]↺ Duplicate[/] {place.get('Name', 'N/A')}"
+                )
+
+        if enricher is not None:
+            while enricher.outstanding() and enricher.alive:
+                progress.update(
+                    task,
+                    description=f"Enriching {query} • {enricher.outstanding()} left"
+                )
+                apply_enrichment(enricher.collect(wait=1.0))
+
+        progress.update(task, description=f"[{THEME['success']}]✔ Done[/] {query}")
+
+    except SearchFailed as e:
+        # rows saved so far are kept; the query counts as failed
+        console.print(f"[bold red][!] Search failed:[/] {query} [dim]({e})[/]")
+        stats["failed"] += 1
+        ok = False
+
+    finally:
+        # close the browser generator first, then persist buffered rows
+        try:
+            if places is not None:
+                places.close()
+        finally:
+            try:
+                if enricher is not None:
+                    # whatever came back is written; the rest stays
+                    # pending in the .enrich log for the next run
+                    enricher.shutdown()
+                    apply_enrichment(enricher.collect(), force=True)
+            finally:
+                try:
+                    writer.close()
+                    if enricher is not None:
+                        # close() applied the updates still queued
+                        apply_enrichment([])
+                finally:
+                    if enricher is not None:
+                        enricher.close()
+                        stats["enrich_waits"].extend(enricher.loads["latencies"])
+                    if frontier is not None:
+                        frontier.close()
+
+            stats["failed"] += len(failures.failed_now)
+            stats["recovered"] += failures.recovered
+            failures.close()
+
+            # also when the query itself broke off
+            if failures.failed_now:
+                reasons = ", ".join(
+                    f"{n} {r}" for r, n in sorted(failures.reasons().items())
+                )
+                console.print(
+                    "[bold yellow][!][/bold yellow] "
+                    "[cyan]Info:[/] "
+                    f"[white]{len(failures.failed_now)} places failed ({reasons}), "
+                    "queued for --retry-failed.[/]"
+                )
+
+    return ok
+
+
+def run_sharded(queries, args, selected_fields, stats, progress, store=None):
+
+    # merged dataset named after the queries file, single writer here
+    name = os.path.splitext(os.path.basename(args.queries_file))[0]
+    writer = open_writer(sanitize_name(name), args, store)
+
+    schema = output_schema(selected_fields, args)
+    writer.set_columns(schema.columns)
+
+    failures = FailureQueue(os.path.splitext(writer.path)[0] + ".failed.jsonl")
+
+    # saved places are recognised by their link in every child; the
+    # index is copied into each process once
+    known_ids = None
+    if args.resume and store is None and writer.seen_ids:
+        known_ids = PlaceIndex(writer.seen_ids.to_array())
+        stats["skipped"] += writer.get_row_count()
+
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            f"[white]{len(known_ids)} saved places will not be reopened.[/]"
+        )
+
+    if writer.shared_ids:
+        known_ids = (
+            writer.shared_ids if known_ids is None
+            else known_ids.union(writer.shared_ids)
+        )
+
+    overall = progress.add_task(
+        f"Queries 0/{len(queries)} • {args.processes} processes",
+        total=args.total if args.total else None,
+        failed=0,
+        duplicates=0
+    )
+    worker_tasks = {}
+    started = 0
+    failed = 0
+    duplicates = 0
+    events = None
+
+    try:
+        events = scrape_sharded(
+            queries,
+            args.processes,
+            max_places=args.total,
+            skip=args.skip,
+            automode=args.auto,
+            workers=args.workers,
+            fields=scrape_fields_for(selected_fields),
+            two_phase=args.two_phase,
+            known_ids=known_ids
+        )
+
+        for kind, worker_id, query, payload in events:
+
+            if worker_id not in worker_tasks:
+                worker_tasks[worker_id] = progress.add_task(
+                    f"Worker {worker_id + 1}",
+                    total=None,
+                    failed=0,
+                    duplicates=0
+                )
+            task = worker_tasks[worker_id]
+
+            if kind == "query":
+                started += 1
+                progress.update(task, description=f"Worker {worker_id + 1} • {query}")
+
+            elif kind == "failed":
+                failed += 1
+                stats["failed"] += 1
+                console.print(
+                    f"[bold red][!] Worker {worker_id + 1} failed:[/] "
+                    f"{query or 'browser'} [dim]({payload})[/]"
+                )
+
+            elif kind == "failure":
+                failures.apply(payload)
+
+            elif kind == "done":
+                progress.update(task, description=f"[{THEME['success']}]✔ Worker {worker_id + 1} done[/]")
+
+            elif kind == "place":
+                stats["fetched"] += 1
+
+                with timed("flatten"):
+                    row = schema.record(payload)
+
+                if writer.write_row(row):
+                    stats["saved"] += 1
+                    progress.update(task, advance=1)
+                    progress.update(overall, advance=1)
+                else:
+                    stats["duplicates"] += 1
+                    duplicates += 1
+
+            # failed queries plus places every worker could not read
+            places_failed = len(failures.failed_now)
+            progress.update(
+                overall,
+                duplicates=duplicates,
+                failed=failed + places_failed,
+                description=(
+                    f"Queries {started}/{len(queries)} • "
+                    f"{args.processes} processes • {failed} failed • "
+                    f"{places_failed} places failed"
+                )
+            )
+
+    finally:
+        try:
+            if events is not None:
+                events.close()
+        finally:
+            writer.close()
+
+            stats["failed"] += len(failures.failed_now)
+            stats["recovered"] += failures.recovered
+            failures.close()
+
+    if failures.failed_now:
+        reasons = ", ".join(f"{n} {r}" for r, n in sorted(failures.reasons().items()))
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            f"[white]{len(failures.failed_now)} places failed ({reasons}), queued for "
+            "--retry-failed with the same --queries-file and --processes.[/]"
+        )
+
+    return True
+
+
+def run_refresh(query, args, stats, progress, session, page=None, store=None) -> bool:
+
+    path = os.path.join("data", f"{sanitize_name(query)}.xlsx")
+    if store is None and not args.journal and not os.path.exists(path):
+        console.print(f"[yellow][!] Nothing to refresh, {path} does not exist[/]")
+        return True
+
+    # the same writer a scrape would use, so --store / --journal keep the
+    # refreshed values instead of restoring them on the next run
+    writer = open_excel_writer(query, args, store)
+
+    # rows a killed run left behind (pending file, journal, store) go
+    # into the workbook first
+    writer.compact()
+    rows = read_rows(path)
+    if not rows:
+        console.print(f"[yellow][!] Nothing to refresh in {path}[/]")
+        writer.close()
+        return True
+
+    state = RefreshState(
+        os.path.splitext(path)[0] + ".refresh.json",
+        created=os.path.getmtime(path)
+    )
+    rows = state.prioritise(rows, by=args.refresh_by)
+    if args.total:
+        rows = rows[:args.total]
+
+    task = progress.add_task(
+        f"Refresh {query}",
+        total=len(rows),
+        failed=0,
+        duplicates=0
+    )
+    updates = {}
+    failed = 0
+    context = None
+
+    try:
+        if page is None:
+            context = session.new_context()
+            page = context.new_page()
+
+        for pid, values, change in refresh_places(page, rows, state, prepare_page(page)):
+            stats["fetched"] += 1
+
+            if values is None:
+                failed += 1
+                stats["failed"] += 1
+                progress.update(task, advance=1, failed=failed)
+                continue
+
+            updates[pid] = values
+            progress.update(
+                task,
+                advance=1,
+                description=f"Refresh {query} • Δ {change:g}"
+            )
+
+    finally:
+        # rows are rewritten once, even when the run is interrupted
+        try:
+            stats["saved"] += writer.update_rows(updates)
+            state.save()
+        finally:
+            writer.close()
+            if context is not None:
+                context.close()
+
+    progress.update(task, description=f"[{THEME['success']}]✔ Refreshed[/] {query}")
+    return True
+
+
 def main():
 
     print_banner()
@@ -127,6 +716,7 @@ def main():
             "  python NirGeoScrapper.py -s \"Cafe in XXXX\"\n"
             "  python NirGeoScrapper.py -s \"Hospital in XXXXXXX\" --total 50\n"
             "  python NirGeoScrapper.py -s \"Restaurant in XXXXXX\" --auto --slow\n"
+            "  python NirGeoScrapper.py --queries-file queries.txt --headless\n"
             "  python NirGeoScrapper.py --list-fields\n"
         ),
         formatter_class=argparse.RawTextHelpFormatter
@@ -148,6 +738,14 @@ def main():
         )
     )
 
+    action_group.add_argument(
+        "--queries-file",
+        help=(
+            "Text file with one search query per line (# for comments).\n"
+            "One browser is reused and each query gets its own Excel file."
+        )
+    )
+
     action_group.add_argument(
         "--list-fields",
         action="store_true",
@@ -202,8 +800,8 @@ def main():
         "--resume",
         action="store_true",
         help=(
-            "Resume scraping from an existing Excel file.\n"
-            "Automatically continues from the last saved place."
+            "Resume scraping from an existing Excel file (or journal with --journal).\n"
+            "Places already saved are recognised by link and never reopened."
         )
     )
 
@@ -225,6 +823,272 @@ def main():
         )
     )
 
+    advanced_opts.add_argument(
+        "--pacing",
+        choices=("adaptive", "static"),
+        default=CONFIG["PACING"],
+        help=(
+            "Delay between places.\n"
+            "'adaptive' speeds up while pages load fine and backs off\n"
+            "on timeouts / empty pages; 'static' keeps the fixed range."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--engine",
+        choices=("sync", "async"),
+        default="sync",
+        help=(
+            "Browser automation backend.\n"
+            "'async' overlaps page work with Excel writes."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--headless",
+        action="store_true",
+        help="Run the browser without a visible window."
+    )
+
+    advanced_opts.add_argument(
+        "--warm",
+        action="store_true",
+        help=(
+            "Reuse one warm browser page for every query\n"
+            "instead of a fresh browser context per query."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--lite",
+        action="store_true",
+        help=(
+            "Block map tiles, fonts, media and third-party scripts.\n"
+            "Only DOM text and image URLs are needed, so output is unchanged."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--extract-mode",
+        choices=("evaluate", "locator"),
+        default=CONFIG["EXTRACT_MODE"],
+        help=(
+            "How place details are read from the page.\n"
+            "'evaluate' reads every field in one round trip."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--enrich",
+        action="store_true",
+        help=(
+            "Save core fields first; Images, Star Breakdown and Reviewers\n"
+            "are filled in afterwards by separate browsers (see --enrich-workers)."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--enrich-workers",
+        type=int,
+        default=1,
+        help="Browsers used by --enrich (default: 1)"
+    )
+
+    advanced_opts.add_argument(
+        "--enrich-batch",
+        type=int,
+        default=100,
+        help="Enriched places written to the Excel file at once (default: 100)"
+    )
+
+    advanced_opts.add_argument(
+        "--refresh",
+        action="store_true",
+        help=(
+            "Re-open places already in the Excel file and update only\n"
+            "Rating, Reviews Count and Open Status (--total limits how many)."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help=(
+            "Only re-open places that failed in earlier runs\n"
+            "(data/<query>.failed.jsonl) and save the ones that load.\n"
+            "With --processes, the merged queue of the queries file is used."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--refresh-by",
+        choices=["age", "change"],
+        default="age",
+        help="Refresh the oldest rows first, or those that changed most last time (default: age)"
+    )
+
+    advanced_opts.add_argument(
+        "--two-phase",
+        action="store_true",
+        help=(
+            "Collect every place link first (data/<query>.frontier),\n"
+            "then open only links that were not saved before."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--bbox",
+        help=(
+            "Tile a bounding box (south,west,north,east) and search every tile.\n"
+            "Tiles that hit the result cap are split into quadrants."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--grid",
+        type=int,
+        default=2,
+        help="Initial grid size for --bbox (N x N tiles)."
+    )
+
+    advanced_opts.add_argument(
+        "--max-depth",
+        type=int,
+        default=CONFIG["MAX_TILE_DEPTH"],
+        help="How many times a capped tile may be split into quadrants."
+    )
+
+    advanced_opts.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help=(
+            "Split --queries-file across N processes, one browser each.\n"
+            "All places are merged into data/<queries file name>.xlsx."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Number of parallel detail pages (pool mode).\n"
+            "One page collects place links, N workers extract details."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--store",
+        action="store_true",
+        help=(
+            "Keep every place in one SQLite store (data/places.db) shared by\n"
+            "all queries. Known places are skipped, Excel files are exported from it."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--ttl",
+        type=float,
+        default=None,
+        metavar="DAYS",
+        help="With --store, places older than DAYS are scraped again (default: never)"
+    )
+
+    advanced_opts.add_argument(
+        "--dedup-all",
+        action="store_true",
+        help=(
+            "Skip places already saved in any output file under data/,\n"
+            "not just the one for the current query."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--images",
+        type=int,
+        default=CONFIG["MAX_IMAGES"],
+        metavar="N",
+        help=f"Image columns (and images collected) per place (default: {CONFIG['MAX_IMAGES']})"
+    )
+
+    advanced_opts.add_argument(
+        "--metrics-json",
+        metavar="PATH",
+        help="Write per-stage timings (count, p50, p95, max) as JSON when the run ends"
+    )
+
+    advanced_opts.add_argument(
+        "--metrics-prom",
+        metavar="PATH",
+        help=(
+            "Keep a Prometheus text file with per-stage timings up to date\n"
+            "while running (for long --auto runs)."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=15.0,
+        help="Seconds between --metrics-prom updates (default: 15)"
+    )
+
+    advanced_opts.add_argument(
+        "--format",
+        default="xlsx",
+        help=(
+            "Output formats, comma-separated: xlsx, csv, jsonl, sqlite, parquet\n"
+            "(default: xlsx). The first one decides what counts as saved."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--parquet",
+        action="store_true",
+        help=(
+            "Same as adding parquet to --format: a typed data/<query>.parquet with\n"
+            "lists and structs instead of flattened columns. Needs pyarrow."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--row-group-size",
+        type=int,
+        default=500,
+        help="Places per Parquet row group (default: 500)"
+    )
+
+    advanced_opts.add_argument(
+        "--journal",
+        action="store_true",
+        help=(
+            "Write places to an append-only journal (data/<query>.jsonl).\n"
+            "The Excel file is built from the journal when the run ends."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--flush-every",
+        type=int,
+        default=25,
+        help=(
+            "Save new rows to disk every N saved places\n"
+            "(the .xlsx itself is rebuilt less and less often).\n"
+            "Pending rows are always flushed on exit or Ctrl+C."
+        )
+    )
+
+    advanced_opts.add_argument(
+        "--flush-interval",
+        type=float,
+        default=10.0,
+        help=(
+            "Save new rows to disk at least every T seconds\n"
+            "while new places are being saved."
+        )
+    )
+
     if len(sys.argv) == 1 or any(a in sys.argv for a in ("-h", "--help")):
         help_text = parser.format_help()
         blocks = help_text.split("\n\n")
@@ -275,7 +1139,7 @@ def main():
         )
         return
 
-    if args.search.startswith("-"):
+    if args.search and args.search.startswith("-"):
         console.print(
             Panel(
                 "[bold red]Invalid value for --search[/]\n\n"
@@ -287,6 +1151,45 @@ def main():
         )
         sys.exit(1)
 
+    if args.queries_file:
+        if not os.path.isfile(args.queries_file):
+            console.print(
+                "[bold red][✖][/bold red] "
+                f"[white]Queries file not found: {args.queries_file}[/]"
+            )
+            sys.exit(1)
+
+        queries = load_queries(args.queries_file)
+
+        if not queries:
+            console.print(
+                "[bold red][✖][/bold red] "
+                "[white]Queries file contains no queries.[/]"
+            )
+            sys.exit(1)
+    else:
+        queries = [args.search]
+
+    formats = []
+    for raw in args.format.split(","):
+        fmt = raw.strip().lower()
+        if fmt not in ["xlsx"] + list(FORMATS):
+            console.print(
+                "[bold red][✖][/bold red] "
+                f"[white]Unknown --format '{raw.strip()}' "
+                f"(choose from xlsx, {', '.join(FORMATS)}).[/]"
+            )
+            sys.exit(1)
+        if fmt not in formats:
+            formats.append(fmt)
+    args.format = formats
+
+    if args.parquet and "parquet" not in args.format:
+        args.format.append("parquet")
+
+    if (args.journal or args.store) and "xlsx" not in args.format:
+        args.format.insert(0, "xlsx")
+
     if args.fields:
         field_map = {f.lower(): f for f in ALL_FIELDS}
 
@@ -320,7 +1223,7 @@ def main():
 
     if "Images" in selected_fields:
         console.print(
-            "[yellow][!] Note:[/] 'Images' expands into Image 1, Image 2, ... columns."
+            f"[yellow][!] Note:[/] 'Images' expands into Image 1 ... Image {args.images} columns."
         )
 
     if args.auto and args.total is not None:
@@ -345,53 +1248,240 @@ def main():
         )
         sys.exit(1)
 
-    stats = {
-        "fetched": 0,
-        "saved": 0,
-        "skipped": 0,
-        "failed": 0,
-        "duplicates": 0,
-        "start_time": time.time(),
-    }
+    if args.workers <= 0:
+        console.print(
+            "[bold red][✖][/bold red] "
+            "[white]--workers must be greater than zero.[/]"
+        )
+        sys.exit(1)
 
-    writer = ExcelWriter(args.search)
+    if args.bbox:
+        try:
+            args.bbox = parse_bbox(args.bbox)
+        except ValueError as e:
+            console.print(
+                "[bold red][✖][/bold red] "
+                f"[white]Invalid --bbox: {e}[/]"
+            )
+            sys.exit(1)
 
+        if args.grid <= 0 or args.max_depth < 0:
+            console.print(
+                "[bold red][✖][/bold red] "
+                "[white]--grid must be positive and --max-depth not negative.[/]"
+            )
+            sys.exit(1)
 
-    if args.resume and writer.headers:
-        selected_fields = [f for f in selected_fields if f in writer.headers]
+        if args.engine == "async" or args.processes > 1:
+            console.print(
+                "[bold yellow][!][/bold yellow] "
+                "[cyan]Info:[/] "
+                "[white]--bbox runs on the sync engine in a single process.[/]"
+            )
+            args.engine = "sync"
+            args.processes = 1
 
-        if not selected_fields:
+    if args.processes <= 0:
+        console.print(
+            "[bold red][✖][/bold red] "
+            "[white]--processes must be greater than zero.[/]"
+        )
+        sys.exit(1)
+
+    if args.processes > 1 and not args.queries_file:
+        console.print(
+            "[bold red][✖][/bold red] "
+            "[white]--processes requires --queries-file.[/]"
+        )
+        sys.exit(1)
+
+    if args.processes > 1 and (args.engine == "async" or args.warm):
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            "[white]--processes uses the sync engine with one browser per process.[/]"
+        )
+        args.engine = "sync"
+        args.warm = False
+
+    if args.processes > 1 and args.store:
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            "[white]With --processes, places already in --store are reopened "
+            "and only deduplicated when saved.[/]"
+        )
+
+    if args.processes > 1 and args.two_phase:
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            "[white]With --processes, --two-phase keeps no .frontier log; "
+            "use --resume to skip saved places.[/]"
+        )
+
+    if args.two_phase and (args.engine == "async" or args.workers > 1):
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            "[white]--two-phase runs on the sync engine with one page.[/]"
+        )
+        args.engine = "sync"
+        args.workers = 1
+
+    if args.engine == "async" and args.workers > 1:
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            "[white]--workers is only used by the sync engine.[/]"
+        )
+        args.workers = 1
+
+    if args.metrics_interval <= 0:
+        console.print(
+            "[bold red][✖][/bold red] "
+            "[white]--metrics-interval must be greater than zero.[/]"
+        )
+        sys.exit(1)
+
+    if args.images <= 0:
+        console.print(
+            "[bold red][✖][/bold red] "
+            "[white]--images must be greater than zero.[/]"
+        )
+        sys.exit(1)
+
+    if args.flush_every <= 0:
+        console.print(
+            "[bold red][✖][/bold red] "
+            "[white]--flush-every must be greater than zero.[/]"
+        )
+        sys.exit(1)
+
+    if args.ttl is not None and args.ttl <= 0:
+        console.print(
+            "[bold red][✖][/bold red] "
+            "[white]--ttl must be greater than zero.[/]"
+        )
+        sys.exit(1)
+
+    if args.store and (args.journal or args.dedup_all):
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            "[white]--store replaces --journal and --dedup-all.[/]"
+        )
+        args.journal = False
+        args.dedup_all = False
+
+    if "parquet" in args.format:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
             console.print(
-                "[bold red][!] Resume failed[/]\n"
-                "[yellow]None of the selected fields exist in the existing Excel file.[/]\n"
-                "[dim]Use --list-fields or remove --resume[/]"
+                "[bold red][✖][/bold red] "
+                "[white]--format parquet needs pyarrow (pip install pyarrow).[/]"
             )
             sys.exit(1)
 
-    if args.resume:
-        try:
-            existing_rows = writer.get_row_count()
-            stats["skipped"] = existing_rows
+        if args.row_group_size <= 0:
+            console.print(
+                "[bold red][✖][/bold red] "
+                "[white]--row-group-size must be greater than zero.[/]"
+            )
+            sys.exit(1)
 
-            if args.skip > 0:
-                console.print(
-                    "[bold yellow][!][/bold yellow] "
-                    "[cyan]Info:[/] "
-                    "[white]--resume overrides --skip.[/]"
-                )
+    if args.enrich_workers <= 0 or args.enrich_batch <= 0:
+        console.print(
+            "[bold red][✖][/bold red] "
+            "[white]--enrich-workers and --enrich-batch must be greater than zero.[/]"
+        )
+        sys.exit(1)
 
-            args.skip = max(args.skip, existing_rows)
-        except (FileNotFoundError, IOError):
-            pass
+    if args.enrich and (
+        args.processes > 1 or args.journal or args.store
+        or args.format != ["xlsx"]
+    ):
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            "[white]--enrich updates rows of the Excel file in a single process; "
+            "heavy fields are scraped inline instead.[/]"
+        )
+        args.enrich = False
+
+    if args.retry_failed and args.refresh:
+        console.print(
+            "[bold red][✖][/bold red] "
+            "[white]--retry-failed cannot be combined with --refresh.[/]"
+        )
+        sys.exit(1)
+
+    if args.retry_failed and args.processes > 1:
+        # sharded runs keep one merged file and failure queue, named
+        # after the queries file (see run_sharded)
+        queries = [os.path.splitext(os.path.basename(args.queries_file))[0]]
+
+    if args.retry_failed and (
+        args.engine == "async" or args.processes > 1 or args.bbox
+        or args.two_phase or args.workers > 1
+    ):
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            "[white]--retry-failed re-opens links on the sync engine with one page.[/]"
+        )
+        args.engine = "sync"
+        args.processes = args.workers = 1
+        args.bbox = None
+        args.two_phase = False
+
+    if args.refresh and (
+        args.engine == "async" or args.processes > 1 or args.bbox or args.two_phase
+    ):
+        console.print(
+            "[bold yellow][!][/bold yellow] "
+            "[cyan]Info:[/] "
+            "[white]--refresh updates saved rows on the sync engine in a single process.[/]"
+        )
+        args.engine = "sync"
+        args.processes = 1
+        args.bbox = None
+        args.two_phase = False
 
+    stats = {
+        "fetched": 0,
+        "saved": 0,
+        "skipped": 0,
+        "failed": 0,
+        "recovered": 0,
+        "enriched": 0,
+        "enrich_waits": [],
+        "duplicates": 0,
+        "start_time": time.time(),
+    }
+
+    CONFIG["EXTRACT_MODE"] = args.extract_mode
+    CONFIG["HEADLESS"] = args.headless
+    CONFIG["BLOCK_RESOURCES"] = args.lite
+    CONFIG["MAX_IMAGES"] = args.images
+
+    CONFIG["PACING"] = args.pacing
 
     if args.slow:
         CONFIG["DELAY_MIN"] = 3.0
         CONFIG["DELAY_MAX"] = 6.0
+        CONFIG["PACE_FLOOR"] = 3.0
+
+    reset_pacer()
 
     config = Text()
-    config.append("Search      : ", style=THEME["secondary"])
-    config.append(f"{args.search}\n", style="white")
+    if args.queries_file:
+        config.append("Queries     : ", style=THEME["secondary"])
+        config.append(f"{len(queries)} from {args.queries_file}\n", style="white")
+    else:
+        config.append("Search      : ", style=THEME["secondary"])
+        config.append(f"{args.search}\n", style="white")
 
     config.append("Mode        : ", style=THEME["secondary"])
     config.append(f"{'AUTO' if args.auto else 'BATCH'}\n", style="white")
@@ -400,10 +1490,51 @@ def main():
     config.append(f"{args.total}\n", style="white")
 
     config.append("Skip        : ", style=THEME["secondary"])
-    config.append(f"{args.skip}\n", style="white")
+    config.append(f"{'resume' if args.resume else args.skip}\n", style="white")
+
+    config.append("Engine      : ", style=THEME["secondary"])
+    config.append(f"{args.engine}\n", style="white")
+
+    config.append("Browser     : ", style=THEME["secondary"])
+    config.append(
+        f"{'headless' if args.headless else 'visible'}"
+        f"{', lite' if args.lite else ''}"
+        f"{', warm page' if args.warm else ''}\n",
+        style="white"
+    )
+
+    if args.bbox:
+        config.append("Tiling      : ", style=THEME["secondary"])
+        config.append(
+            f"{args.grid}x{args.grid} over {', '.join(map(str, args.bbox))}, "
+            f"depth ≤ {args.max_depth}\n",
+            style="white"
+        )
+
+    config.append("Workers     : ", style=THEME["secondary"])
+    config.append(
+        f"{args.workers}"
+        f"{f' × {args.processes} processes' if args.processes > 1 else ''}\n",
+        style="white"
+    )
+
+    if args.enrich:
+        config.append("Enrichment  : ", style=THEME["secondary"])
+        config.append(
+            f"deferred, {args.enrich_workers} browser"
+            f"{'s' if args.enrich_workers > 1 else ''}\n",
+            style="white"
+        )
 
     config.append("Delay range : ", style=THEME["secondary"])
-    config.append(f"{CONFIG['DELAY_MIN']}–{CONFIG['DELAY_MAX']} sec\n", style="white")
+    if CONFIG["PACING"] == "adaptive":
+        config.append(
+            f"adaptive {CONFIG['PACE_FLOOR']}–{CONFIG['PACE_CEILING']} sec, "
+            f"starts at {PACER.snapshot()['delay']} sec\n",
+            style="white"
+        )
+    else:
+        config.append(f"{CONFIG['DELAY_MIN']}–{CONFIG['DELAY_MAX']} sec\n", style="white")
 
     config.append("Fields      : ", style=THEME["secondary"])
     config.append(", ".join(selected_fields), style="white")
@@ -416,6 +1547,27 @@ def main():
         )
     )
 
+    store = PlaceStore("data/places.db", ttl_days=args.ttl) if args.store else None
+
+    def run_counters():
+        return {
+            "places_fetched": stats["fetched"],
+            "places_saved": stats["saved"],
+            "places_duplicate": stats["duplicates"],
+            "places_failed": stats["failed"],
+            "places_recovered": stats["recovered"],
+            "places_enriched": stats["enriched"],
+            "pace_delay_seconds": PACER.snapshot()["delay"],
+        }
+
+    reporter = None
+    # a lone query that failed exits 1, after the summary and metrics
+    query_failed = False
+    if args.metrics_prom:
+        reporter = PrometheusReporter(
+            args.metrics_prom, args.metrics_interval, run_counters
+        ).start()
+
     try:
         with Progress(
                 SpinnerColumn(style=THEME["primary"]),
@@ -431,51 +1583,62 @@ def main():
                 console=console
         ) as progress:
 
-            task = progress.add_task(
-                "Scraping places...",
-                total=args.total if args.total else None,
-                failed=0,
-                duplicates=0
-            )
-
-            for place in scrape_google_maps(
-                    search_query=args.search,
-                    max_places=args.total,
-                    skip=args.skip,
-                    automode=args.auto
-            ):
-                stats["fetched"] += 1
-
-                flat_data = flatten_for_excel(place)
-                filtered_output = {
-                    k: v for k, v in flat_data.items()
-                    if (
-                            k in selected_fields
-                            or k.startswith("Image ")
-                            or k in ("Name", "Address", "Maps URL")
-                    )
-                }
-
-                if writer.write_row(filtered_output):
-                    stats["saved"] += 1
-                    progress.update(
-                        task,
-                        advance=1,
-                        description=f"[{THEME['success']}]✔[/] {place.get('Name', 'N/A')}"
-                    )
-
-                else:
-                    stats["duplicates"] += 1
+            if args.processes > 1:
+                run_sharded(queries, args, selected_fields, stats, progress, store)
+            else:
+                with open_session(args) as session:
+                    overall = None
+                    if len(queries) > 1:
+                        overall = progress.add_task(
+                            f"Queries 0/{len(queries)}",
+                            total=len(queries),
+                            failed=0,
+                            duplicates=0
+                        )
+
+                    page = session.new_page() if args.warm else None
+
+                    for n, query in enumerate(queries, start=1):
+                        try:
+                            if args.refresh:
+                                ok = run_refresh(
+                                    query, args, stats, progress, session, page, store
+                                )
+                            else:
+                                ok = run_query(
+                                    query, args, selected_fields, stats, progress,
+                                    session, page, store
+                                )
+                        except Exception as e:
+                            console.print(f"[bold red][!] Query failed:[/] {query} [dim]({e})[/]")
+                            stats["failed"] += 1
+                            ok = False
+
+                        if not ok and len(queries) == 1:
+                            query_failed = True
+
+                        if overall is not None:
+                            progress.update(
+                                overall,
+                                advance=1,
+                                description=f"Queries {n}/{len(queries)}"
+                            )
 
-                    progress.update(
-                        task,
-                        duplicates=stats["duplicates"],
-                        description=f"[{THEME['warning']}]↺ Duplicate[/] {place.get('Name', 'N/A')}"
-                    )
+    except KeyboardInterrupt:
+        console.print(
+            f"\n[bold yellow][!] Stopped by user. "
+            f"{'Journal' if args.journal else 'Excel file'} is SAFE.[/]"
+        )
 
+    finally:
+        if store is not None:
+            store.close()
+        if reporter is not None:
+            reporter.stop()
 
-    except KeyboardInterrupt:
-        console.print("\n[bold yellow][!] Stopped by user. Excel file is SAFE.[/]")
+    if args.metrics_json:
+        write_json(args.metrics_json, run_counters())
+        console.print(f"[dim]Stage metrics written to {args.metrics_json}[/]")
 
     if args.stats:
         duration = int(time.time() - stats["start_time"])
@@ -491,7 +1654,45 @@ def main():
         summary.append(f"Saved   : {stats['saved']}\n", style=THEME["success"])
         summary.append(f"Skipped : {stats['skipped']}\n", style=THEME["warning"])
         summary.append(f"Duplicates: {stats['duplicates']}\n", style=THEME["warning"])
+        summary.append(f"Failed  : {stats['failed']}\n", style=THEME["error"])
+        if stats["recovered"]:
+            summary.append(f"Recovered: {stats['recovered']}\n", style=THEME["success"])
+        if stats["enriched"]:
+            summary.append(f"Enriched: {stats['enriched']}\n", style=THEME["success"])
         summary.append(f"Duration: {duration}s\n", style="white")
+
+        if PLACE_LATENCIES:
+            avg_wait = sum(PLACE_LATENCIES) / len(PLACE_LATENCIES)
+            saved_wait = sum(
+                max(CONFIG["DETAIL_TIMEOUT"] - t, 0) for t in PLACE_LATENCIES
+            )
+            summary.append(f"Avg wait: {avg_wait:.2f}s/place\n", style="white")
+            summary.append(f"Wait saved: {saved_wait:.0f}s\n", style=THEME["success"])
+
+        if stats["enrich_waits"]:
+            avg_wait = sum(stats["enrich_waits"]) / len(stats["enrich_waits"])
+            summary.append(f"Enrich wait: {avg_wait:.2f}s/place\n", style="white")
+
+        if PLACE_BYTES:
+            avg_kb = sum(PLACE_BYTES) / len(PLACE_BYTES) / 1024
+            summary.append(f"Avg data: {avg_kb:.0f} KB/place\n", style="white")
+
+        if TRAFFIC["requests"]:
+            summary.append(
+                f"Network : {TRAFFIC['bytes'] / 1048576:.1f} MB, "
+                f"{TRAFFIC['requests']} requests, {TRAFFIC['blocked']} blocked\n",
+                style="white"
+            )
+
+        if CONFIG["PACING"] == "adaptive":
+            pace = PACER.snapshot()
+            summary.append(
+                f"Pacing  : {pace['delay']:.2f}s delay, "
+                f"{pace['backoffs']} backoffs, "
+                f"{pace['failures']}/{pace['loads']} bad loads\n",
+                style="white"
+            )
+
         summary.append(f"Rate    : {rate:.2f} places/min", style=THEME["primary"])
 
         console.print(
@@ -502,6 +1703,29 @@ def main():
             )
         )
 
+        stages = snapshot()
+        if stages:
+            table = Table(title="Stage Timings", border_style=THEME["panel"])
+            table.add_column("Stage", style=THEME["secondary"])
+            for col in ("Count", "p50", "p95", "Max", "Total"):
+                table.add_column(col, justify="right")
+
+            # slowest stages first
+            for stage, s in sorted(stages.items(), key=lambda kv: -kv[1]["sum"]):
+                table.add_row(
+                    stage,
+                    str(s["count"]),
+                    f"{s['p50'] * 1000:.1f} ms",
+                    f"{s['p95'] * 1000:.1f} ms",
+                    f"{s['max'] * 1000:.1f} ms",
+                    f"{s['sum']:.1f} s",
+                )
+
+            console.print(table)
+
+    if query_failed:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
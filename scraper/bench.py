@@ -0,0 +1,699 @@
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from contextlib import redirect_stdout
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from google import (
+    CONFIG,
+    FIELD_REGISTRY,
+    scrape_google_maps,
+    browser_session,
+    harvest_place_urls,
+)
+from google_async import scrape_google_maps_async, AsyncBrowserSession
+from excel import ExcelWriter
+from formats import FORMATS
+from utils import RowSchema, flatten_for_excel, place_id
+from metrics import STAGES, STAGES_LOCK, snapshot
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+# ================= OFFLINE BENCHMARKS =================
+#
+# Measures the scraper without touching live Google Maps.
+#
+#   scrape  -> serves a fixture folder (result list + place panes) from a
+#              local HTTP server and runs every engine against it
+#   writers -> ExcelWriter / --format sinks at 1k, 10k, 100k rows,
+#              flattening and resume-time loading
+#   record  -> saves a real search as a fixture folder (needs network)
+#
+# A fixture folder holds index.json ({"places": [{path, name, file}]})
+# and one HTML file per place with the detail pane, scripts stripped.
+#
+#   python bench.py scrape --synthetic 60 --engines sync,two-phase,pool,async
+#   python bench.py scrape --fixtures fixtures/cafe --latency 0.05
+#   python bench.py writers --rows 1000,10000 --json bench.json
+#   python bench.py record -s "Cafe in xxxxxx" --count 40 --out fixtures/cafe
+
+ENGINES = ("sync", "two-phase", "pool", "async")
+
+# timed page operations that cost a driver <-> browser round trip
+PAGE_OPS = ("select.", "card_list", "click_wait", "goto", "scroll", "open_search")
+
+
+def reset_stages():
+    with STAGES_LOCK:
+        STAGES.clear()
+
+
+def measure(fn, memory: bool = False):
+    """(result, seconds, peak python MB or None) of fn()"""
+
+    # tracemalloc slows Python-heavy code several times over, so the
+    # timings of a --memory run are not comparable with a plain one
+    reset_stages()
+    if memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+
+    return result, elapsed, peak
+
+
+# ================= FIXTURES =================
+
+STARS = ["5", "4", "3", "2", "1"]
+
+
+def synthetic_place(i: int, rng: random.Random) -> dict:
+    """Fake place with every field filled, as extract_place() returns it"""
+
+    lat = 40.0 + rng.random()
+    lng = -74.0 + rng.random()
+    reviews = rng.randint(0, 5000)
+
+    return {
+        "Name": f"Bench Place {i}",
+        "Category": rng.choice(["Cafe", "Restaurant", "Bakery", "Bar"]),
+        "Rating": f"{rng.uniform(1, 5):.1f}",
+        "Reviews Count": reviews,
+        "Address": f"{i} Bench Street, Testville",
+        "Plus Code": f"{rng.randint(1000, 9999)}+{rng.randint(10, 99)} Testville",
+        "Located In": "N/A",
+        "Phone": f"+1 555-{i:04d}",
+        "Website": f"https://place{i}.example.com/",
+        "Open Status": rng.choice(["Open", "Closed", "Closes soon"]),
+        "Latitude": f"{lat:.7f}",
+        "Longitude": f"{lng:.7f}",
+        "Maps URL": (
+            f"https://www.google.com/maps/place/Bench+Place+{i}/@{lat:.7f},{lng:.7f},17z"
+            f"/data=!4m6!3m5!1s0x0:0x{0x10000 + i:x}!8m2!3d{lat:.7f}!4d{lng:.7f}"
+        ),
+        "Images": [
+            f"https://lh5.googleusercontent.com/p/AF1Qip{i}x{n}=w2000-h2000-k-no"
+            for n in range(rng.randint(0, 12))
+        ],
+        "Star Breakdown": {
+            s: f"{s} stars, {rng.randint(0, reviews):,} reviews" for s in STARS
+        },
+        "Reviewers": [
+            {
+                "name": f"Reviewer {n}",
+                "profile_url": f"https://www.google.com/maps/contrib/{i}{n}?hl=en"
+            }
+            for n in range(rng.randint(0, 8))
+        ],
+    }
+
+
+def digits(text: str) -> str:
+    return "".join(c for c in text if c.isdigit() or c == "+")
+
+
+def synthetic_pane(place: dict, filler: int) -> str:
+    """Detail pane markup matching google.PLACE_SELECTORS"""
+
+    e = escape
+    parts = [
+        '<div role="main">',
+        f'<h1 class="DUwDvf">{e(place["Name"])}</h1>',
+        f'<button jsaction="pane.rating.category">{e(place["Category"])}</button>',
+        f'<div class="fontDisplayLarge">{e(place["Rating"])}</div>',
+        f'<button class="GQjSyb">({place["Reviews Count"]:,})</button>',
+        f'<button data-item-id="address"><div class="Io6YTe">{e(place["Address"])}</div></button>',
+        f'<button data-item-id="oloc"><div class="Io6YTe">{e(place["Plus Code"])}</div></button>',
+        f'<button data-item-id="phone:tel:{digits(place["Phone"])}">'
+        f'<div class="Io6YTe">{e(place["Phone"])}</div></button>',
+        f'<a data-item-id="authority" href="{e(place["Website"])}">website</a>',
+        f'<span class="ZDu9vd">{e(place["Open Status"])}</span>',
+    ]
+
+    for url in place["Images"]:
+        parts.append(f'<button class="K4UgGe"><img src="{e(url.replace("w2000-h2000", "w80-h106"))}"></button>')
+
+    parts.append("<table>")
+    for s, label in place["Star Breakdown"].items():
+        parts.append(f'<tr aria-label="{e(label)}"><td>{s}</td></tr>')
+    parts.append("</table>")
+
+    for r in place["Reviewers"]:
+        parts.append(
+            f'<div class="jftiEf"><div class="d4r55">{e(r["name"])}</div>'
+            f'<button class="al6Kxe" data-href="{e(r["profile_url"])}"></button></div>'
+        )
+
+    # real panes are thousands of nodes; selectors should pay for that
+    parts.extend(f'<div class="bench-fill"><span>{n}</span></div>' for n in range(filler))
+    parts.append("</div>")
+
+    return "\n".join(parts)
+
+
+def url_path(url: str) -> str:
+    # fixtures are served from any host, keep /maps/place/... only
+    return "/" + url.split("://", 1)[-1].split("/", 1)[-1]
+
+
+def write_fixture_index(folder: str, query: str, places):
+
+    with open(os.path.join(folder, "index.json"), "w", encoding="utf-8") as f:
+        json.dump({"query": query, "places": places}, f, indent=2)
+
+
+def write_synthetic_fixtures(folder: str, count: int, filler: int = 1500, seed: int = 1):
+
+    os.makedirs(os.path.join(folder, "place"), exist_ok=True)
+    rng = random.Random(seed)
+
+    places = []
+    for i in range(count):
+        place = synthetic_place(i, rng)
+        name = f"place/{i}.html"
+
+        with open(os.path.join(folder, name), "w", encoding="utf-8") as f:
+            f.write(synthetic_pane(place, filler))
+
+        places.append({"path": url_path(place["Maps URL"]), "name": place["Name"], "file": name})
+
+    write_fixture_index(folder, "synthetic", places)
+    return folder
+
+
+# outerHTML of the detail pane without anything that would run or load
+PANE_JS = """
+() => {
+    const h = document.querySelector('h1.DUwDvf');
+    const pane = (h && h.closest('div[role="main"]')) || document.body;
+    const copy = pane.cloneNode(true);
+    copy.querySelectorAll('script, style, link, iframe, noscript').forEach(el => el.remove());
+    return copy.outerHTML;
+}
+"""
+
+
+def record_fixtures(query: str, folder: str, count: int):
+    """Save a live search as a fixture folder (result links + place panes)"""
+
+    os.makedirs(os.path.join(folder, "place"), exist_ok=True)
+    places = []
+
+    with browser_session() as browser:
+        page = browser.new_page()
+        urls = harvest_place_urls(page, query)[:count]
+
+        for i, url in enumerate(urls):
+            try:
+                page.goto(url, timeout=60000)
+                page.wait_for_selector("h1.DUwDvf", timeout=15000)
+                # let the lazy parts of the pane (photos, reviews) render
+                page.wait_for_timeout(1500)
+                pane = page.evaluate(PANE_JS)
+                name = page.inner_text("h1.DUwDvf").strip()
+            except Exception:
+                console.print(f"[yellow]skipped[/] {url}")
+                continue
+
+            file_name = f"place/{i}.html"
+            with open(os.path.join(folder, file_name), "w", encoding="utf-8") as f:
+                f.write(pane)
+
+            places.append({"path": url_path(page.url), "name": name, "file": file_name})
+            console.print(f"[{len(places)}/{len(urls)}] {name}")
+
+    write_fixture_index(folder, query, places)
+    return len(places)
+
+
+# ================= FIXTURE SERVER =================
+#
+# The result list is revealed page_size cards per mouse wheel and ends
+# with the "end of list" marker; clicking a card swaps the place into
+# the detail pane and pushes its URL, like the real single-page app.
+# Direct /maps/place/... loads (two-phase, pool) return the pane alone.
+# The CSP keeps recorded image / script URLs from leaving the machine.
+
+PAGE_HEAD = """<!doctype html>
+<html><head><meta charset="utf-8">
+<meta http-equiv="Content-Security-Policy"
+      content="default-src 'self'; script-src 'self' 'unsafe-inline'; style-src 'self' 'unsafe-inline'">
+<title>{title}</title></head><body>
+"""
+
+SEARCH_SCRIPT = """
+<script>
+const feed = document.getElementById('feed');
+const cards = Array.from(document.getElementById('cards').content.children);
+let shown = 0;
+function more() {
+    cards.slice(shown, shown + PAGE_SIZE).forEach(c => feed.appendChild(c));
+    shown = Math.min(shown + PAGE_SIZE, cards.length);
+    if (shown >= cards.length && !document.querySelector('span.HlvSq')) {
+        const end = document.createElement('span');
+        end.className = 'HlvSq';
+        end.textContent = "You've reached the end of the list.";
+        feed.after(end);
+    }
+}
+more();
+window.addEventListener('wheel', () => setTimeout(more, SCROLL_DELAY));
+document.addEventListener('click', async e => {
+    const a = e.target.closest('a[href*="/maps/place"]');
+    if (!a) return;
+    e.preventDefault();
+    const html = await (await fetch(a.href)).text();
+    const doc = new DOMParser().parseFromString(html, 'text/html');
+    document.getElementById('pane').innerHTML = doc.getElementById('pane').innerHTML;
+    history.pushState(null, '', a.href);
+});
+</script>
+"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+
+        server = self.server
+        server.count_request()
+
+        if server.latency:
+            time.sleep(server.latency)
+
+        path = self.path.split("?", 1)[0]
+
+        if path.startswith("/maps/place/"):
+            pane = server.panes.get(place_id(path))
+            if pane is None:
+                self.send_error(404)
+                return
+            body = PAGE_HEAD.format(title="place") + f'<div id="pane">{pane}</div></body></html>'
+        elif path.startswith("/maps"):
+            body = server.search_page
+        else:
+            self.send_error(404)
+            return
+
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, folder: str, latency: float = 0.0, page_size: int = 20):
+
+        super().__init__(("127.0.0.1", 0), FixtureHandler)
+
+        with open(os.path.join(folder, "index.json"), encoding="utf-8") as f:
+            index = json.load(f)
+
+        self.panes = {}
+        cards = []
+        for entry in index["places"]:
+            with open(os.path.join(folder, entry["file"]), encoding="utf-8") as f:
+                self.panes[place_id(entry["path"])] = f.read()
+
+            name = escape(entry["name"])
+            cards.append(
+                f'<div class="Nv2PK"><a class="hfpxzc" href="{escape(entry["path"])}" '
+                f'aria-label="{name}">{name}</a></div>'
+            )
+
+        self.places = len(self.panes)
+        self.search_page = (
+            PAGE_HEAD.format(title=escape(index.get("query", "bench")))
+            + '<div role="feed" id="feed"></div><div id="pane"></div>'
+            + f'<template id="cards">{"".join(cards)}</template>'
+            + SEARCH_SCRIPT
+                .replace("PAGE_SIZE", str(page_size))
+                .replace("SCROLL_DELAY", str(int(latency * 1000)))
+            + "</body></html>"
+        )
+
+        self.latency = latency
+        self.requests = 0
+        self.requests_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count_request(self):
+        with self.requests_lock:
+            self.requests += 1
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+# ================= SCRAPE BENCHMARK =================
+
+def run_engine(engine: str, start_url: str, workers: int, fields, limit):
+    """Number of places one engine scrapes from start_url"""
+
+    options = dict(max_places=limit, fields=fields, start_url=start_url)
+
+    if engine == "async":
+        with AsyncBrowserSession() as session:
+            places = session.iterate(scrape_google_maps_async(
+                "bench", browser=session.browser, **options
+            ))
+            return sum(1 for _ in places)
+
+    if engine == "two-phase":
+        options["two_phase"] = True
+    elif engine == "pool":
+        options["workers"] = workers
+
+    with browser_session() as browser:
+        return sum(1 for _ in scrape_google_maps("bench", browser=browser, **options))
+
+
+def bench_scrape(
+    server: FixtureServer, engines, workers: int, fields, limit,
+    memory=False, verbose=False
+):
+
+    results = []
+    start_url = server.base_url + "/maps/search/bench"
+
+    for engine in engines:
+        server.requests = 0
+        out = sys.stdout if verbose else io.StringIO()
+
+        with redirect_stdout(out):
+            places, seconds, peak_mb = measure(
+                lambda: run_engine(engine, start_url, workers, fields, limit),
+                memory
+            )
+
+        stages = snapshot()
+        page_ops = sum(
+            s["count"] for stage, s in stages.items() if stage.startswith(PAGE_OPS)
+        )
+
+        results.append({
+            "engine": engine,
+            "places": places,
+            "seconds": round(seconds, 3),
+            "places_per_sec": round(places / seconds, 2) if seconds else 0.0,
+            "http_per_place": round(server.requests / places, 2) if places else 0.0,
+            "page_ops_per_place": round(page_ops / places, 2) if places else 0.0,
+            "py_peak_mb": peak_mb and round(peak_mb, 1),
+            "stages": stages,
+        })
+
+    return results
+
+
+# ================= WRITER BENCHMARKS =================
+
+def bench_writers(sizes, folder: str, flush_every: int, formats, memory=False, seed: int = 1):
+
+    fields = list(FIELD_REGISTRY)
+    schema = RowSchema(fields, CONFIG["MAX_IMAGES"])
+    rng = random.Random(seed)
+    results = []
+
+    for n in sizes:
+        places = [synthetic_place(i, rng) for i in range(n)]
+
+        def add(name, rows, seconds, peak_mb):
+            results.append({
+                "bench": name,
+                "rows": rows,
+                "seconds": round(seconds, 3),
+                "rows_per_sec": round(rows / seconds) if seconds else 0,
+                "py_peak_mb": peak_mb and round(peak_mb, 1),
+            })
+
+        # ---------- FLATTEN ----------
+        _, seconds, peak = measure(
+            lambda: [flatten_for_excel(p, CONFIG["MAX_IMAGES"]) for p in places], memory
+        )
+        add("flatten_for_excel", n, seconds, peak)
+
+        records, seconds, peak = measure(lambda: [schema.record(p) for p in places], memory)
+        add("RowSchema.record", n, seconds, peak)
+
+        # ---------- EXCEL ----------
+        run_folder = os.path.join(folder, f"rows_{n}")
+        shutil.rmtree(run_folder, ignore_errors=True)
+
+        def write_excel():
+            writer = ExcelWriter("bench", run_folder, flush_every, flush_interval=None)
+            writer.set_columns(schema.columns)
+            for data in records:
+                writer.write_row(data)
+            writer.close()
+            return writer
+
+        writer, seconds, peak = measure(write_excel, memory)
+        add(f"ExcelWriter (flush every {flush_every})", writer.get_row_count(), seconds, peak)
+
+        # ---------- RESUME ----------
+        writer, seconds, peak = measure(lambda: ExcelWriter("bench", run_folder), memory)
+        add("resume xlsx (index)", writer.get_row_count(), seconds, peak)
+
+        os.remove(writer.index_path)
+        writer, seconds, peak = measure(lambda: ExcelWriter("bench", run_folder), memory)
+        add("resume xlsx (scan)", writer.get_row_count(), seconds, peak)
+
+        # ---------- OTHER FORMATS ----------
+        for fmt in formats:
+            def write_sink():
+                sink = FORMATS[fmt]("bench", run_folder).open()
+                sink.set_columns(schema.columns)
+                for i in range(0, len(records), 25):
+                    sink.write_batch(records[i:i + 25])
+                sink.close()
+                return sink
+
+            sink, seconds, peak = measure(write_sink, memory)
+            add(f"{fmt} sink", sink.get_row_count(), seconds, peak)
+
+            def reopen():
+                sink = FORMATS[fmt]("bench", run_folder).open()
+                sink.close()
+                return sink
+
+            sink, seconds, peak = measure(reopen, memory)
+            add(f"resume {fmt}", sink.get_row_count(), seconds, peak)
+
+        shutil.rmtree(run_folder, ignore_errors=True)
+
+    return results
+
+
+# ================= REPORT =================
+
+def mb(value) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def print_scrape(results):
+
+    table = Table(title="Scrape Engines", border_style="bright_blue")
+    table.add_column("Engine", style="bright_blue")
+    for col in ("Places", "Seconds", "Places/s", "HTTP/place", "Page ops/place", "Py peak MB"):
+        table.add_column(col, justify="right")
+
+    for r in results:
+        table.add_row(
+            r["engine"],
+            str(r["places"]),
+            f"{r['seconds']:.2f}",
+            f"{r['places_per_sec']:.2f}",
+            f"{r['http_per_place']:.2f}",
+            f"{r['page_ops_per_place']:.2f}",
+            mb(r["py_peak_mb"]),
+        )
+
+    console.print(table)
+
+
+def print_writers(results):
+
+    table = Table(title="Writers", border_style="bright_blue")
+    table.add_column("Benchmark", style="bright_blue")
+    for col in ("Rows", "Seconds", "Rows/s", "Py peak MB"):
+        table.add_column(col, justify="right")
+
+    for r in results:
+        table.add_row(
+            r["bench"],
+            str(r["rows"]),
+            f"{r['seconds']:.3f}",
+            str(r["rows_per_sec"]),
+            mb(r["py_peak_mb"]),
+        )
+
+    console.print(table)
+
+
+def save_json(path: str, section: str, results):
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    data = {"generated_at": time.time(), "config": dict(CONFIG), section: results}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+# ================= CLI =================
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        prog="bench",
+        description="Offline benchmarks for NirGeoScrapper (no live Google Maps)."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scrape = sub.add_parser("scrape", help="Run the scrape engines against local fixtures")
+    source = scrape.add_mutually_exclusive_group()
+    source.add_argument("--fixtures", metavar="DIR", help="Fixture folder (see record)")
+    source.add_argument(
+        "--synthetic", type=int, default=60, metavar="N",
+        help="Generate N synthetic places when no --fixtures is given (default: 60)"
+    )
+    scrape.add_argument(
+        "--engines", default=",".join(ENGINES),
+        help=f"Comma-separated engines to run (default: {','.join(ENGINES)})"
+    )
+    scrape.add_argument("--workers", type=int, default=3, help="Detail pages for the pool engine")
+    scrape.add_argument("--limit", type=int, help="Stop each engine after N places")
+    scrape.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    scrape.add_argument("--page-size", type=int, default=20, help="Cards revealed per scroll")
+    scrape.add_argument("--filler", type=int, default=1500, help="Extra nodes per synthetic pane")
+    scrape.add_argument("--extract-mode", choices=("evaluate", "locator"), default=CONFIG["EXTRACT_MODE"])
+    scrape.add_argument("--fields", help="Comma-separated fields to extract (default: all)")
+    scrape.add_argument("--headed", action="store_true", help="Show the browser windows")
+    scrape.add_argument("--memory", action="store_true", help="Track peak Python memory (slower)")
+    scrape.add_argument("--verbose", action="store_true", help="Keep the scraper's own output")
+    scrape.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+
+    writers = sub.add_parser("writers", help="Benchmark output writers, flattening and resume")
+    writers.add_argument(
+        "--rows", default="1000,10000,100000",
+        help="Comma-separated row counts (default: 1000,10000,100000)"
+    )
+    writers.add_argument("--flush-every", type=int, default=500, help="ExcelWriter flush size")
+    writers.add_argument(
+        "--formats", default="csv,jsonl,sqlite",
+        help="Comma-separated --format sinks to include (default: csv,jsonl,sqlite)"
+    )
+    writers.add_argument("--memory", action="store_true", help="Track peak Python memory (slower)")
+    writers.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+
+    record = sub.add_parser("record", help="Save a live search as a fixture folder")
+    record.add_argument("-s", "--search", required=True, help="Search query")
+    record.add_argument("--count", type=int, default=40, help="Places to save")
+    record.add_argument("--out", required=True, metavar="DIR", help="Fixture folder")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        saved = record_fixtures(args.search, args.out, args.count)
+        console.print(f"[green]✔[/] {saved} places saved to {args.out}")
+        return
+
+    if args.command == "writers":
+        sizes = [int(n) for n in args.rows.split(",") if n.strip()]
+        formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+
+        unknown = [f for f in formats if f not in FORMATS]
+        if unknown:
+            parser.error(f"unknown format(s): {', '.join(unknown)}")
+
+        with tempfile.TemporaryDirectory() as folder:
+            results = bench_writers(sizes, folder, args.flush_every, formats, args.memory)
+
+        print_writers(results)
+        if args.json:
+            save_json(args.json, "writers", results)
+        return
+
+    # ---------- SCRAPE ----------
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engine(s): {', '.join(unknown)}")
+
+    fields = None
+    if args.fields:
+        fields = [f.strip() for f in args.fields.split(",") if f.strip()]
+        unknown = [f for f in fields if f not in FIELD_REGISTRY]
+        if unknown:
+            parser.error(f"unknown field(s): {', '.join(unknown)}")
+
+    # pacing and timeouts are not what is being measured
+    CONFIG.update(
+        PACING="static",
+        DELAY_MIN=0.0,
+        DELAY_MAX=0.0,
+        HEADLESS=not args.headed,
+        EXTRACT_MODE=args.extract_mode,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.fixtures or write_synthetic_fixtures(tmp, args.synthetic, args.filler)
+
+        with FixtureServer(folder, args.latency, args.page_size) as server:
+            # enough scrolls to reveal every card, never an endless loop
+            CONFIG["MAX_SCROLLS"] = server.places // max(args.page_size, 1) + 5
+            console.print(f"[cyan]Serving {server.places} places at {server.base_url}[/]")
+            results = bench_scrape(
+                server, engines, args.workers, fields, args.limit,
+                args.memory, args.verbose
+            )
+
+    print_scrape(results)
+    if args.json:
+        save_json(args.json, "scrape", results)
+
+
+if __name__ == "__main__":
+    main()
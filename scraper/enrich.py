@@ -0,0 +1,114 @@
+import queue
+import threading
+
+from google import detail_worker, FIELD_REGISTRY, CONFIG
+from frontier import Frontier
+from pacing import AdaptivePacer
+
+# ================= ENRICHMENT =================
+#
+# Second stage of --enrich. The crawl reads only the cheap fields and
+# saves each place right away; every saved Maps URL is handed to this
+# pool, which re-opens the place on its own browsers (--enrich-workers)
+# and reads the heavy fields (Images, Star Breakdown, Reviewers).
+# Links are logged in data/<query>.enrich (frontier format) and marked
+# done once their row is updated, so an interrupted run resumes there.
+# The pool has its own pacer and load stats: its loads neither slow the
+# crawl down nor show up in the crawl's wait / data numbers.
+
+HEAVY_FIELDS = [f for f, spec in FIELD_REGISTRY.items() if spec["cost"] == "heavy"]
+
+
+class Enricher:
+
+    def __init__(self, path: str, fields, workers: int = 1):
+
+        self.log = Frontier(path)
+        self.fields = list(fields)
+
+        self.url_queue = queue.Queue()
+        self.result_queue = queue.Queue()
+        self.stop = threading.Event()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+        self.pacer = AdaptivePacer(
+            start=(CONFIG["DELAY_MIN"] + CONFIG["DELAY_MAX"]) / 2,
+            floor=CONFIG["PACE_FLOOR"],
+            ceiling=CONFIG["PACE_CEILING"]
+        )
+        self.loads = {"latencies": [], "bytes": []}
+
+        self.threads = [
+            threading.Thread(
+                target=detail_worker,
+                args=(
+                    self.url_queue, self.result_queue, self.stop, self.fields,
+                    self.pacer, self.loads
+                ),
+                daemon=True
+            )
+            for _ in range(max(int(workers), 1))
+        ]
+        self.alive = len(self.threads)
+
+        for t in self.threads:
+            t.start()
+
+        # links left over from an earlier run (interrupted or failed)
+        for url in self.log.pending():
+            self._queue(url)
+
+    def _queue(self, url: str):
+        self.url_queue.put(url)
+        self.submitted += 1
+
+    def submit(self, url: str):
+        if url not in self.log:
+            self.log.add([url])
+            self._queue(url)
+
+    def outstanding(self) -> int:
+        return self.submitted - self.completed
+
+    def collect(self, wait: float = 0) -> list:
+        """(url, place) pairs finished so far, waits up to wait seconds for one"""
+
+        results = []
+        block = wait > 0
+
+        while True:
+            try:
+                kind, payload = self.result_queue.get(block, wait if block else None)
+            except queue.Empty:
+                return results
+            block = False
+
+            if kind == "exit":
+                self.alive -= 1
+            elif kind == "failed":
+                # stays pending in the log, retried by the next --enrich run
+                self.completed += 1
+                self.failed += 1
+                self.log.mark(payload[0], "failed")
+            elif kind == "place":
+                self.completed += 1
+                results.append(payload)
+
+    def mark_done(self, urls):
+        for url in urls:
+            self.log.mark(url, "done")
+
+    def shutdown(self):
+        """Stop the workers; results already fetched can still be collected"""
+
+        self.stop.set()
+        for _ in self.threads:
+            self.url_queue.put(None)
+        for t in self.threads:
+            t.join(timeout=30)
+
+    def close(self):
+        self.log.close()
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+
+from utils import place_id
+
+# ================= FAILURE QUEUE =================
+#
+# Place links that could not be read, per query (data/<query>.failed.jsonl).
+# One JSON line per event, the last line for a place wins:
+#   {"url", "reason", "attempts", "at"}  -> still failing
+#   {"url", "resolved": true, "at"}      -> read on a later attempt
+# Open failures are retried at the end of the crawl (up to
+# RETRY_MAX_ATTEMPTS) and by --retry-failed.
+
+
+class FailureQueue:
+
+    def __init__(self, path: str = None):
+
+        self.path = path
+        self.entries = {}
+
+        # places that failed / were recovered during this run
+        self.failed_now = set()
+        self.recovered = 0
+
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._load(json.loads(line))
+                    except (ValueError, KeyError):
+                        continue
+
+        self.fh = open(path, "a", encoding="utf-8") if path else None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, url) -> bool:
+        return place_id(url) in self.entries
+
+    def _load(self, entry: dict):
+
+        key = place_id(entry["url"])
+        if entry.get("resolved"):
+            self.entries.pop(key, None)
+        else:
+            self.entries[key] = entry
+
+    def _write(self, entry: dict):
+
+        self._load(entry)
+        if self.fh is not None:
+            self.fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.fh.flush()
+
+    def apply(self, entry: dict):
+        """Record one event (also used for events sent by shard workers)"""
+
+        key = place_id(entry["url"])
+
+        if entry.get("resolved"):
+            if key not in self.entries:
+                return
+            self.failed_now.discard(key)
+            self.recovered += 1
+        else:
+            self.failed_now.add(key)
+
+        self._write(entry)
+
+    def add(self, url: str, reason: str):
+
+        attempts = self.entries.get(place_id(url), {}).get("attempts", 0) + 1
+        self.apply({
+            "url": url,
+            "reason": reason,
+            "attempts": attempts,
+            "at": round(time.time()),
+        })
+
+    def resolve(self, url: str):
+        if place_id(url) in self.entries:
+            self.apply({"url": url, "resolved": True, "at": round(time.time())})
+
+    def pending(self, max_attempts: int = None) -> list:
+        """Links of open failures, those tried max_attempts times left out"""
+        return [
+            e["url"] for e in self.entries.values()
+            if max_attempts is None or e["attempts"] < max_attempts
+        ]
+
+    def reasons(self) -> dict:
+
+        counts = {}
+        for e in self.entries.values():
+            reason = e["reason"].split(":", 1)[0]
+            counts[reason] = counts.get(reason, 0) + 1
+        return counts
+
+    def close(self):
+        if self.fh is not None and not self.fh.closed:
+            self.fh.close()
@@ -0,0 +1,394 @@
+import os
+import csv
+import json
+import sqlite3
+from abc import abstractmethod
+
+from excel import sanitize_name, make_place_key, is_duplicate, PlaceIndex
+from store import row_place_id
+from parquet import parquet_fields, parquet_schema, typed_row
+from sink import Sink
+from metrics import timed
+
+# ================= STREAMING SINKS =================
+#
+# Plain append-only outputs selected with --format. Each one rebuilds
+# its dedup index from its own file on open() and writes whole batches
+# with the backend's bulk call (csv writerows, one file write,
+# sqlite executemany, one Parquet row group).
+
+
+class IndexedSink(Sink):
+
+    ext = None
+
+    def __init__(self, search_query: str, base_folder: str = "data"):
+
+        os.makedirs(base_folder, exist_ok=True)
+
+        safe_query = sanitize_name(search_query)
+        self.path = os.path.join(base_folder, f"{safe_query}.{self.ext}")
+
+        self.seen_places = PlaceIndex()
+        self.seen_ids = PlaceIndex()
+        self.headers = []
+        self.rows = 0
+
+    def _track(self, data: dict):
+
+        self.seen_places.add(make_place_key(data["Name"], data["Address"]))
+        pid = row_place_id(data)
+        if not pid.startswith("key:"):
+            self.seen_ids.add(pid)
+        self.rows += 1
+
+    def seen(self, data: dict) -> bool:
+        return is_duplicate(data, self.seen_ids, self.seen_places)
+
+    def write_batch(self, rows) -> int:
+
+        fresh = []
+        for data in rows:
+            if data.get("Name") and data.get("Address") and not self.seen(data):
+                self._track(data)
+                fresh.append(data)
+
+        if fresh:
+            self._write(fresh)
+
+        return len(fresh)
+
+    @abstractmethod
+    def _write(self, rows):
+        """Append rows that passed the dedup check"""
+
+    def get_row_count(self) -> int:
+        return self.rows
+
+
+class CsvSink(IndexedSink):
+
+    ext = "csv"
+
+    def open(self):
+
+        self.file_rows = 0
+        if os.path.exists(self.path):
+            with open(self.path, newline="", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                self.headers = list(reader.fieldnames or [])
+                for data in reader:
+                    self.file_rows += 1
+                    if data.get("Name") and data.get("Address"):
+                        self._track(data)
+
+        self.fh = open(self.path, "a", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.fh)
+        self.columns = None
+        return self
+
+    def set_columns(self, columns):
+
+        # a file started with another layout keeps its own header
+        if self.file_rows and self.headers != list(columns):
+            return
+
+        # a header with no rows under it is written again in this layout
+        if not self.file_rows and self.headers and self.headers != list(columns):
+            self.fh.seek(0)
+            self.fh.truncate()
+            self.headers = []
+
+        self.columns = list(columns)
+
+    def _write(self, rows):
+
+        if self.columns:
+            if not self.headers:
+                self.headers = list(self.columns)
+                self.writer.writerow(self.headers)
+            self.writer.writerows(list(data.values()) for data in rows)
+            self.fh.flush()
+            return
+
+        # the header is fixed by the first batch ever written
+        if not self.headers:
+            for data in rows:
+                for k in data.keys():
+                    if k not in self.headers:
+                        self.headers.append(k)
+            self.writer.writerow(self.headers)
+
+        self.writer.writerows([data.get(h, "") for h in self.headers] for data in rows)
+        self.fh.flush()
+
+    def close(self):
+        if not self.fh.closed:
+            self.fh.close()
+
+
+class JsonlSink(IndexedSink):
+
+    ext = "jsonl"
+
+    def open(self):
+
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        continue
+                    if data.get("Name") and data.get("Address"):
+                        self._track(data)
+                        for k in data.keys():
+                            if k not in self.headers:
+                                self.headers.append(k)
+
+        self.fh = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def _write(self, rows):
+        self.fh.write("".join(
+            json.dumps(data, ensure_ascii=False, default=str) + "\n" for data in rows
+        ))
+        self.fh.flush()
+
+    def close(self):
+        if not self.fh.closed:
+            self.fh.close()
+
+
+class SqliteSink(IndexedSink):
+
+    ext = "sqlite"
+
+    def open(self):
+
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS places ("
+            "place_id TEXT PRIMARY KEY, name TEXT, address TEXT, data TEXT NOT NULL)"
+        )
+
+        for (data,) in self.db.execute("SELECT data FROM places ORDER BY rowid"):
+            data = json.loads(data)
+            self._track(data)
+            for k in data.keys():
+                if k not in self.headers:
+                    self.headers.append(k)
+
+        return self
+
+    def _write(self, rows):
+        self.db.executemany(
+            "INSERT OR IGNORE INTO places VALUES (?, ?, ?, ?)",
+            [
+                (
+                    row_place_id(data),
+                    data["Name"],
+                    data["Address"],
+                    json.dumps(data, ensure_ascii=False, default=str)
+                )
+                for data in rows
+            ]
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+class ParquetSink(IndexedSink):
+    """Typed columns (see parquet.py), rebuilt next to the old file and swapped in on close"""
+
+    ext = "parquet"
+
+    def __init__(self, search_query: str, base_folder: str = "data", row_group_size: int = 500):
+
+        super().__init__(search_query, base_folder)
+
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("--format parquet needs pyarrow (pip install pyarrow)")
+
+        self.pa = pa
+        self.pq = pq
+
+        self.tmp_path = self.path + ".tmp"
+        self.row_group_size = max(int(row_group_size), 1)
+        self.fields = parquet_fields(pa, [])
+        self.schema = None
+        self.writer = None
+        self.buffer = []
+
+    def open(self):
+
+        # the dedup index only needs Name / Address / Maps URL
+        if os.path.exists(self.path):
+            src = self.pq.ParquetFile(self.path)
+            self.headers = list(src.schema_arrow.names)
+            cols = [c for c in ("Name", "Address", "Maps URL") if c in self.headers]
+
+            if "Name" in cols and "Address" in cols:
+                for batch in src.iter_batches(columns=cols):
+                    for data in batch.to_pylist():
+                        if data.get("Name") and data.get("Address"):
+                            self._track(data)
+
+        return self
+
+    def set_columns(self, columns):
+        # fixed once the new file is started
+        if self.writer is None:
+            self.fields = parquet_fields(self.pa, columns)
+
+    def _start(self):
+
+        self.schema = parquet_schema(self.pa, self.fields)
+        self.writer = self.pq.ParquetWriter(self.tmp_path, self.schema)
+
+        if not os.path.exists(self.path):
+            return
+
+        # rows from earlier runs, one row group at a time; columns
+        # that are not selected any more are dropped, new ones are null
+        src = self.pq.ParquetFile(self.path)
+        names = set(src.schema_arrow.names)
+
+        for i in range(src.num_row_groups):
+            group = src.read_row_group(i)
+            columns = [
+                group.column(f).cast(self.schema.field(f).type) if f in names
+                else self.pa.nulls(group.num_rows, self.schema.field(f).type)
+                for f in self.fields
+            ]
+            self.writer.write_table(
+                self.pa.Table.from_arrays(columns, schema=self.schema)
+            )
+
+    def _write(self, rows):
+
+        if self.writer is None:
+            self._start()
+
+        self.buffer.extend(typed_row(data, self.fields) for data in rows)
+        if len(self.buffer) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+
+        if self.buffer:
+            self.writer.write_table(
+                self.pa.Table.from_pylist(self.buffer, schema=self.schema)
+            )
+            self.buffer = []
+
+    def close(self):
+
+        # nothing new: the old file stays as it is
+        if self.writer is None:
+            return
+
+        self.flush()
+        self.writer.close()
+        self.writer = None
+        os.replace(self.tmp_path, self.path)
+
+
+FORMATS = {
+    "csv": CsvSink,
+    "jsonl": JsonlSink,
+    "sqlite": SqliteSink,
+    "parquet": ParquetSink,
+}
+
+
+# ================= SINK SET =================
+
+class SinkSet(Sink):
+    """Several sinks fed with the same rows; the first one is the primary"""
+
+    def __init__(self, sinks, batch_size: int = 25):
+
+        self.sinks = list(sinks)
+        self.primary = self.sinks[0]
+        self.batch_size = max(int(batch_size), 1)
+
+        self.pending = []
+        self.pending_places = PlaceIndex()
+        self.pending_ids = PlaceIndex()
+
+    # resume, frontier and tile state follow the primary sink
+    @property
+    def path(self):
+        return self.primary.path
+
+    @property
+    def headers(self):
+        return self.primary.headers
+
+    @property
+    def seen_ids(self):
+        return self.primary.seen_ids
+
+    @property
+    def shared_ids(self):
+        return self.primary.shared_ids
+
+    def open(self):
+        for sink in self.sinks:
+            sink.open()
+        return self
+
+    def set_columns(self, columns):
+        for sink in self.sinks:
+            sink.set_columns(columns)
+
+    def seen(self, data: dict) -> bool:
+        # every sink also drops rows it already has in write_batch()
+        return (
+            is_duplicate(data, self.pending_ids, self.pending_places)
+            or self.primary.seen(data)
+        )
+
+    def write_batch(self, rows) -> int:
+        return sum(self.write_row(data) for data in rows)
+
+    def write_row(self, data: dict) -> bool:
+
+        if not data.get("Name") or not data.get("Address") or self.seen(data):
+            return False
+
+        self.pending.append(data)
+        self.pending_places.add(make_place_key(data["Name"], data["Address"]))
+        self.pending_ids.add(row_place_id(data))
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+        return True
+
+    def flush(self):
+
+        if self.pending:
+            for sink in self.sinks:
+                with timed(f"write_batch.{type(sink).__name__}"):
+                    sink.write_batch(self.pending)
+
+            self.pending = []
+            self.pending_places = PlaceIndex()
+            self.pending_ids = PlaceIndex()
+
+    def close(self):
+
+        self.flush()
+        for sink in self.sinks:
+            sink.close()
+
+    def get_row_count(self) -> int:
+        return self.primary.get_row_count() + len(self.pending)
@@ -0,0 +1,61 @@
+import os
+
+# ================= FRONTIER =================
+#
+# Append-only log of place links for one query (data/<query>.frontier).
+# Each line is "<status>\t<url>"; the last line for a url wins.
+#   new    -> harvested from the result list, not opened yet
+#   done   -> details extracted and handed to the writer
+#   failed -> detail page could not be read, retried on the next run
+
+
+class Frontier:
+
+    def __init__(self, path: str):
+
+        self.path = path
+        self.status = {}
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    status, _, url = line.rstrip("\n").partition("\t")
+                    if url:
+                        self.status[url] = status
+
+        self.fh = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, url) -> bool:
+        return url in self.status
+
+    def _write(self, url, status):
+        self.status[url] = status
+        self.fh.write(f"{status}\t{url}\n")
+
+    def add(self, urls) -> int:
+
+        added = 0
+        for url in urls:
+            if url not in self.status:
+                self._write(url, "new")
+                added += 1
+
+        self.fh.flush()
+        return added
+
+    def mark(self, url, status: str):
+        self._write(url, status)
+        self.fh.flush()
+
+    def is_done(self, url) -> bool:
+        return self.status.get(url) == "done"
+
+    def pending(self) -> list:
+        return [url for url, status in self.status.items() if status != "done"]
+
+    def done_count(self) -> int:
+        return sum(1 for status in self.status.values() if status == "done")
+
+    def close(self):
+        if not self.fh.closed:
+            self.fh.close()
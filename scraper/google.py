@@ -2,25 +2,230 @@ from playwright.sync_api import sync_playwright, TimeoutError
 import time
 import re
 import random
+import queue
+import threading
+import weakref
+from contextlib import contextmanager
+from urllib.parse import quote_plus
+
+from utils import place_id
+from metrics import record, timed
+from pacing import AdaptivePacer
 
 # ================= CONFIG =================
 
 CONFIG = {
     "DELAY_MIN": 0.6,
     "DELAY_MAX": 1.5,
+    "PACING": "adaptive",      # "adaptive" (AIMD on load health) or "static"
+    "PACE_FLOOR": 0.2,         # adaptive delay bounds, starts mid DELAY range
+    "PACE_CEILING": 15.0,
+    "SEARCH_RETRIES": 2,       # result list that never loads, with backoff
+    "RETRY_ROUNDS": 2,         # end-of-crawl passes over failed places
+    "RETRY_BACKOFF": 5.0,      # seconds before the first retry, doubled per round
+    "RETRY_MAX_ATTEMPTS": 3,   # failed places are retried until this many tries
     "MAX_SCROLLS": 25,
-    "SCROLL_PAUSE": 1.2,
+    "SCROLL_PAUSE": 1.2,       # upper bound, returns once new cards load
+    "DETAIL_TIMEOUT": 3.0,     # upper bound, returns once the pane switches
     "MAX_IMAGES": 20,          # safety cap
+    "EXTRACT_MODE": "evaluate",  # "evaluate" (1 round trip) or "locator"
+    "HEADLESS": False,
+    "BLOCK_RESOURCES": False,  # drop tiles, fonts, media, 3rd-party scripts
+    "TILE_CAP": 120,           # results per search before a tile is split
+    "MAX_TILE_DEPTH": 4,
+    "VIEWPORT_WIDTH": 1280,    # default Chromium viewport, used for zoom
+}
+
+# seconds from click/goto until the detail pane was ready, per place
+PLACE_LATENCIES = []
+
+# network bytes received while opening + reading each place
+PLACE_BYTES = []
+
+# whole-run network totals, shared by every page
+TRAFFIC = {"bytes": 0, "requests": 0, "blocked": 0}
+TRAFFIC_LOCK = threading.Lock()
+
+# delay / concurrency controller shared by every worker (see pacing.py)
+PACER = AdaptivePacer()
+
+# ================= NETWORK =================
+
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+BLOCKED_URL_PARTS = (
+    "/maps/vt",            # vector / raster map tiles
+    "/kh/v=",              # satellite tiles
+    "/maps/rt/",
+    "/gen_204",
+    "/log?",
+    "doubleclick.net",
+    "googletagmanager.com",
+    "google-analytics.com",
+)
+
+FIRST_PARTY_HOSTS = ("google.com", "gstatic.com", "googleapis.com", "ggpht.com")
+
+
+def should_block(resource_type, url):
+
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+
+    if any(part in url for part in BLOCKED_URL_PARTS):
+        return True
+
+    if resource_type == "script":
+        host = url.split("/")[2] if "://" in url else ""
+        return not any(
+            host == h or host.endswith("." + h) for h in FIRST_PARTY_HOSTS
+        )
+
+    return False
+
+
+def count_traffic(traffic, key, amount=1):
+    traffic[key] += amount
+    with TRAFFIC_LOCK:
+        TRAFFIC[key] += amount
+
+
+PAGE_TRAFFIC = weakref.WeakKeyDictionary()
+
+
+def prepare_page(page):
+    """Attach request blocking and byte counting, returns the page's counters"""
+
+    if page in PAGE_TRAFFIC:
+        return PAGE_TRAFFIC[page]
+
+    traffic = {"bytes": 0, "requests": 0, "blocked": 0}
+    PAGE_TRAFFIC[page] = traffic
+
+    if CONFIG["BLOCK_RESOURCES"]:
+        def route_filter(route):
+            request = route.request
+            if should_block(request.resource_type, request.url):
+                count_traffic(traffic, "blocked")
+                route.abort()
+            else:
+                route.continue_()
+
+        page.route("**/*", route_filter)
+
+    def loading_finished(event):
+        count_traffic(traffic, "requests")
+        count_traffic(traffic, "bytes", int(event.get("encodedDataLength", 0)))
+
+    try:
+        cdp = page.context.new_cdp_session(page)
+        cdp.on("Network.loadingFinished", loading_finished)
+        cdp.send("Network.enable")
+    except Exception:
+        pass
+
+    return traffic
+
+
+# ================= READINESS =================
+
+# Maps may push the new URL before the pane re-renders, so a changed
+# link alone is not enough: the heading has to match the clicked card
+# (its aria-label), or have changed while the link points to the card's
+# place. Same-name chains keep their heading, for them the link is all
+# there is. placeId() mirrors utils.place_id().
+PLACE_CHANGED_JS = """
+([prevName, prevUrl, cardHref]) => {
+    const h = document.querySelector('h1.DUwDvf');
+    const name = h ? h.innerText.trim() : '';
+    if (name === '') return false;
+
+    const placeId = (url) => {
+        let m = url.match(/!1s0x[0-9a-f]+:0x([0-9a-f]+)/);
+        if (m) return 'cid:' + BigInt('0x' + m[1]).toString();
+        m = url.match(/[?&](?:cid|ludocid)=(\\d+)/);
+        if (m) return 'cid:' + BigInt(m[1]).toString();
+        return url.split('?')[0].split(/\\/(?:@|data=)/)[0].replace(/\\/+$/, '').toLowerCase();
+    };
+
+    const card = Array.from(document.querySelectorAll('a[href*="/maps/place"]'))
+        .find(a => a.href === cardHref);
+    const label = card ? (card.getAttribute('aria-label') || '').trim() : '';
+    const onCard = placeId(location.href) === placeId(cardHref);
+
+    if (label && label !== prevName && name === label && location.href !== prevUrl) return true;
+    if (name !== prevName && onCard) return true;
+    return label === prevName && location.href !== prevUrl && onCard;
 }
+"""
+
+# "You've reached the end of the list." footer of the results feed
+END_OF_LIST = 'span.HlvSq'
+
+CARDS_GREW_JS = """
+(prevCount) => document.querySelectorAll('a[href*="/maps/place"]').length > prevCount
+"""
 
 # ================= HELPERS =================
 
-def throttle():
-    """Human-like random delay"""
-    time.sleep(random.uniform(
+def reset_pacer():
+    """Re-read the pacing bounds from CONFIG"""
+    PACER.configure(
+        start=(CONFIG["DELAY_MIN"] + CONFIG["DELAY_MAX"]) / 2,
+        floor=CONFIG["PACE_FLOOR"],
+        ceiling=CONFIG["PACE_CEILING"]
+    )
+
+
+def pause_seconds(pacer=None) -> float:
+
+    if CONFIG["PACING"] == "adaptive":
+        return (pacer or PACER).next_delay()
+
+    return random.uniform(
         CONFIG["DELAY_MIN"],
         CONFIG["DELAY_MAX"]
-    ))
+    )
+
+
+def throttle(pacer=None):
+    """Human-like random delay"""
+    delay = pause_seconds(pacer)
+    time.sleep(delay)
+    record("throttle", delay)
+
+
+class SearchFailed(Exception):
+    """The result list never loaded"""
+
+
+def failure_reason(error: Exception) -> str:
+    """'<kind>: <detail>' for the failure queue"""
+
+    detail = (str(error).strip().splitlines() or [type(error).__name__])[0][:200]
+    if isinstance(error, TimeoutError):
+        return f"timeout: {detail}"
+    return f"error: {type(error).__name__}: {detail}"
+
+
+def extraction_empty(place: dict) -> bool:
+    """True when none of the fields read from the pane came back"""
+
+    # many places have no photos or reviews, so the heavy fields alone
+    # never make a load count as empty
+    values = [
+        v for f, v in place.items()
+        if FIELD_REGISTRY[f]["reads"] and FIELD_REGISTRY[f]["cost"] != "heavy"
+    ]
+    if not values:
+        return False
+
+    def blank(v):
+        if isinstance(v, dict):
+            return all(blank(x) for x in v.values())
+        return v in (None, "", "N/A", 0, [])
+
+    return all(blank(v) for v in values)
 
 
 def get_text(node, selector, default="N/A"):
@@ -44,6 +249,30 @@ def get_attr(node, selector, attr, default="N/A"):
     return default
 
 
+def wait_for_place_change(page, prev_name, prev_url, card_href):
+    try:
+        page.wait_for_function(
+            PLACE_CHANGED_JS,
+            arg=[prev_name, prev_url, card_href],
+            timeout=CONFIG["DETAIL_TIMEOUT"] * 1000
+        )
+        return True
+    except TimeoutError:
+        return False
+
+
+def wait_for_more_cards(page, prev_count):
+    try:
+        page.wait_for_function(
+            CARDS_GREW_JS,
+            arg=prev_count,
+            timeout=CONFIG["SCROLL_PAUSE"] * 1000
+        )
+        return True
+    except TimeoutError:
+        return False
+
+
 def extract_lat_lng(url: str):
     if not url:
         return "N/A", "N/A"
@@ -87,170 +316,947 @@ def parse_reviews_count(text: str) -> int:
     return int(number)
 
 
-def scrape_google_maps(
-    search_query,
-    max_places=None,
-    skip=0,
-    automode=False
+@contextmanager
+def browser_session():
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=CONFIG["HEADLESS"])
+        try:
+            yield browser
+        finally:
+            browser.close()
+
+
+def list_end_reached(page):
+    try:
+        return page.locator(END_OF_LIST).count() > 0
+    except Exception:
+        return False
+
+
+def open_search(page, search_query, start_url=None):
+    with timed("open_search"):
+        try:
+            _open_search(page, search_query, start_url)
+        except TimeoutError as e:
+            raise SearchFailed(f"results did not load for {search_query!r}") from e
+
+
+def _open_search(page, search_query, start_url=None):
+
+    if start_url:
+        # explicit viewport, e.g. /maps/search/<query>/@lat,lng,zoomz
+        page.goto(start_url, timeout=60000)
+    elif "google.com/maps" in page.url:
+        # warm page: the old result list is still on screen, so load the
+        # search directly instead of typing into the box
+        page.goto(
+            "https://www.google.com/maps/search/" + quote_plus(search_query),
+            timeout=60000
+        )
+    else:
+        page.goto("https://www.google.com/maps", timeout=60000)
+        page.wait_for_selector("input#UGojuc", timeout=15000)
+
+        page.fill("input#UGojuc", search_query)
+        page.keyboard.press("Enter")
+
+    page.wait_for_selector('//a[contains(@href,"/maps/place")]', timeout=20000)
+
+
+# ================= EXTRACTION =================
+#
+# Every selector read from the detail pane lives in PLACE_SELECTORS.
+# kinds:  text  -> innerText of first match
+#         attr  -> attribute of first match
+#         all   -> attribute of every match (capped at MAX_IMAGES)
+#         each  -> one sub-record per match, read with "fields"
+#         group -> record of "fields" read from the same root
+
+PLACE_SELECTORS = {
+    "name":        {"kind": "text", "css": 'h1.DUwDvf'},
+    "category":    {"kind": "text", "css": 'button[jsaction*="category"]'},
+    "rating":      {"kind": "text", "css": 'div.fontDisplayLarge'},
+    "reviews":     {"kind": "text", "css": 'button.GQjSyb'},
+    "address":     {"kind": "text", "css": 'button[data-item-id="address"] .Io6YTe'},
+    "plus_code":   {"kind": "text", "css": 'button[data-item-id="oloc"] .Io6YTe'},
+    "located_in":  {"kind": "text", "css": 'button[data-item-id="locatedin"] .Io6YTe'},
+    "phone":       {"kind": "text", "css": 'button[data-item-id*="phone"] .Io6YTe'},
+    "website":     {"kind": "attr", "css": 'a[data-item-id*="authority"]', "attr": "href"},
+    "open_status": {"kind": "text", "css": 'span.ZDu9vd'},
+    "photo_imgs":  {"kind": "all", "css": 'button.K4UgGe img[src]', "attr": "src"},
+    "review_imgs": {"kind": "all", "css": 'button.Tya61d[style*="background-image"]', "attr": "style"},
+    "street_imgs": {"kind": "all", "css": 'img[src*="streetviewpixels"]', "attr": "src"},
+    "stars": {"kind": "group", "fields": {
+        star: {"kind": "attr", "css": f'tr[aria-label^="{star} stars"]', "attr": "aria-label"}
+        for star in ["5", "4", "3", "2", "1"]
+    }},
+    "reviewers": {"kind": "each", "css": 'div.jftiEf', "fields": {
+        "name":        {"kind": "text", "css": 'div.d4r55'},
+        "profile_url": {"kind": "attr", "css": 'button.al6Kxe', "attr": "data-href"},
+    }},
+}
+
+# one round trip: reads the whole table in the page, returns one object
+EXTRACT_JS = """
+({fields, limit}) => {
+    const read = (root, spec) => {
+        if (spec.kind === 'group') return readAll(root, spec.fields);
+        if (spec.kind === 'all' || spec.kind === 'each') {
+            let els = Array.from(root.querySelectorAll(spec.css));
+            if (spec.kind === 'each') return els.map(el => readAll(el, spec.fields));
+            return els.slice(0, limit).map(el => el.getAttribute(spec.attr));
+        }
+        const el = root.querySelector(spec.css);
+        if (!el) return null;
+        if (spec.kind === 'text') return el.innerText.trim();
+        return el.getAttribute(spec.attr) || null;
+    };
+    const readAll = (root, fields) => {
+        const out = {};
+        for (const [key, spec] of Object.entries(fields)) out[key] = read(root, spec);
+        return out;
+    };
+    return readAll(document, fields);
+}
+"""
+
+
+def _read_locators(root, spec):
+
+    kind = spec["kind"]
+
+    if kind == "group":
+        return _read_all_locators(root, spec["fields"])
+
+    if kind == "text":
+        return get_text(root, spec["css"], default=None)
+
+    if kind == "attr":
+        return get_attr(root, spec["css"], spec["attr"], default=None)
+
+    loc = root.locator(spec["css"])
+
+    if kind == "each":
+        return [
+            _read_all_locators(loc.nth(i), spec["fields"])
+            for i in range(loc.count())
+        ]
+
+    return [
+        loc.nth(i).get_attribute(spec["attr"])
+        for i in range(min(loc.count(), CONFIG["MAX_IMAGES"]))
+    ]
+
+
+def _read_all_locators(root, fields):
+    return {key: _read_locators(root, spec) for key, spec in fields.items()}
+
+
+def read_place_fields(page, fields=PLACE_SELECTORS):
+
+    if CONFIG["EXTRACT_MODE"] == "evaluate":
+        with timed("select.evaluate"):
+            return page.evaluate(
+                EXTRACT_JS,
+                {"fields": fields, "limit": CONFIG["MAX_IMAGES"]}
+            )
+
+    # one timer per selector key (photo_imgs, reviewers, ...)
+    raw = {}
+    for key, spec in fields.items():
+        with timed(f"select.{key}"):
+            raw[key] = _read_locators(page, spec)
+    return raw
+
+
+# ================= FIELD REGISTRY =================
+#
+# Output field -> selector keys it reads, how the raw values are turned
+# into the final value, and how expensive the DOM work is
+# ("free" = parsed from the URL, "cheap" = single node, "heavy" = loops).
+
+def _text_field(key):
+    def build(raw, current_url):
+        value = raw.get(key)
+        return "N/A" if value is None else value
+    return build
+
+
+def _build_reviews_count(raw, current_url):
+    return parse_reviews_count(_text_field("reviews")(raw, current_url))
+
+
+def _build_latitude(raw, current_url):
+    return extract_lat_lng(current_url)[0]
+
+
+def _build_longitude(raw, current_url):
+    return extract_lat_lng(current_url)[1]
+
+
+def _build_maps_url(raw, current_url):
+    return current_url
+
+
+def _build_images(raw, current_url):
+
+    image_urls = set()
+
+    sources = list(raw.get("photo_imgs") or [])
+    for style in raw.get("review_imgs") or []:
+        if style:
+            m = re.search(r'url\("(.*?)"\)', style)
+            if m:
+                sources.append(m.group(1))
+    sources += raw.get("street_imgs") or []
+
+    for src in sources:
+        src = clean_image_url(src)
+        if src:
+            image_urls.add(src)
+
+    return list(image_urls)
+
+
+def _build_star_breakdown(raw, current_url):
+    stars = raw.get("stars") or {}
+    return {
+        star: stars.get(star) or "N/A"
+        for star in PLACE_SELECTORS["stars"]["fields"]
+    }
+
+
+def _build_reviewers(raw, current_url):
+    return [
+        {
+            "name": r.get("name") if r.get("name") is not None else "N/A",
+            "profile_url": r.get("profile_url") or "N/A"
+        }
+        for r in raw.get("reviewers") or []
+    ]
+
+
+FIELD_REGISTRY = {
+    "Name":           {"reads": ["name"],        "build": _text_field("name"),        "cost": "cheap"},
+    "Category":       {"reads": ["category"],    "build": _text_field("category"),    "cost": "cheap"},
+    "Rating":         {"reads": ["rating"],      "build": _text_field("rating"),      "cost": "cheap"},
+    "Reviews Count":  {"reads": ["reviews"],     "build": _build_reviews_count,       "cost": "cheap"},
+    "Address":        {"reads": ["address"],     "build": _text_field("address"),     "cost": "cheap"},
+    "Plus Code":      {"reads": ["plus_code"],   "build": _text_field("plus_code"),   "cost": "cheap"},
+    "Located In":     {"reads": ["located_in"],  "build": _text_field("located_in"),  "cost": "cheap"},
+    "Phone":          {"reads": ["phone"],       "build": _text_field("phone"),       "cost": "cheap"},
+    "Website":        {"reads": ["website"],     "build": _text_field("website"),     "cost": "cheap"},
+    "Open Status":    {"reads": ["open_status"], "build": _text_field("open_status"), "cost": "cheap"},
+    "Latitude":       {"reads": [],              "build": _build_latitude,            "cost": "free"},
+    "Longitude":      {"reads": [],              "build": _build_longitude,           "cost": "free"},
+    "Maps URL":       {"reads": [],              "build": _build_maps_url,            "cost": "free"},
+    "Images":         {"reads": ["photo_imgs", "review_imgs", "street_imgs"],
+                       "build": _build_images,          "cost": "heavy"},
+    "Star Breakdown": {"reads": ["stars"],       "build": _build_star_breakdown,      "cost": "heavy"},
+    "Reviewers":      {"reads": ["reviewers"],   "build": _build_reviewers,           "cost": "heavy"},
+}
+
+
+def selectors_for(fields=None):
+
+    if fields is None:
+        return PLACE_SELECTORS
+
+    keys = {key for f in fields for key in FIELD_REGISTRY[f]["reads"]}
+    return {k: v for k, v in PLACE_SELECTORS.items() if k in keys}
+
+
+def build_place(raw, current_url, fields=None):
+
+    if fields is None:
+        fields = FIELD_REGISTRY
+
+    place = {}
+    for f in FIELD_REGISTRY:
+        if f in fields:
+            with timed(f"build.{f}"):
+                place[f] = FIELD_REGISTRY[f]["build"](raw, current_url)
+
+    return place
+
+
+def extract_place(page, current_url, fields=None):
+    with timed("extract"):
+        selectors = selectors_for(fields)
+        raw = read_place_fields(page, selectors) if selectors else {}
+        return build_place(raw, current_url, fields)
+
+
+def collect_place_urls(page):
+    with timed("card_list"):
+        return page.eval_on_selector_all(
+            'a[href*="/maps/place"]',
+            "els => els.map(e => e.href)"
+        )
+
+
+def canonical_place_url(url: str) -> str:
+    # card links carry tracking params (?authuser=0&hl=en&rclk=1)
+    return url.split("?", 1)[0]
+
+
+def harvest_place_urls(page, search_query, start_url=None, info=None):
+    """Scroll the result feed and collect every place link, no clicks"""
+
+    info = {} if info is None else info
+    info.update(cards=0, end_reached=False)
+
+    open_search(page, search_query, start_url)
+
+    harvested = []
+    seen_ids = set()
+    scrolls = 0
+
+    while True:
+        urls = collect_place_urls(page)
+
+        for url in map(canonical_place_url, urls):
+            pid = place_id(url)
+            if pid not in seen_ids:
+                seen_ids.add(pid)
+                harvested.append(url)
+
+        info["cards"] = len(harvested)
+        print(f"[harvest] {len(harvested)} links", end="\r")
+
+        if list_end_reached(page):
+            info["end_reached"] = True
+            break
+
+        scrolls += 1
+        if scrolls >= CONFIG["MAX_SCROLLS"]:
+            break
+
+        with timed("scroll"):
+            page.mouse.wheel(0, 6000)
+            wait_for_more_cards(page, len(urls))
+
+    print()
+    return harvested
+
+
+def fetch_place(page, url, fields=None, traffic=None, pacer=None, loads=None):
+    """Open a place link directly and extract it"""
+
+    # pacer / loads ({"latencies": [], "bytes": []}) default to the
+    # crawl's own; the enrichment pool keeps separate ones
+    pacer = PACER if pacer is None else pacer
+    latencies = PLACE_LATENCIES if loads is None else loads["latencies"]
+    sizes = PLACE_BYTES if loads is None else loads["bytes"]
+
+    started = time.monotonic()
+    bytes_before = traffic["bytes"] if traffic else 0
+
+    try:
+        page.goto(url, timeout=60000)
+        page.wait_for_selector('h1.DUwDvf', timeout=15000)
+    except Exception:
+        pacer.report(ok=False)
+        raise
+
+    latencies.append(time.monotonic() - started)
+    record("goto", latencies[-1])
+
+    place = extract_place(page, page.url, fields)
+    pacer.report(latencies[-1], ok=not extraction_empty(place))
+    if traffic:
+        sizes.append(traffic["bytes"] - bytes_before)
+
+    return place
+
+
+# ================= POOL MODE =================
+
+def detail_worker(url_queue, result_queue, stop, fields, pacer=None, loads=None):
+
+    try:
+        with browser_session() as browser:
+            page = browser.new_page()
+            traffic = prepare_page(page)
+
+            while not stop.is_set():
+                url = url_queue.get()
+                if url is None:
+                    break
+
+                try:
+                    place = fetch_place(page, url, fields, traffic, pacer, loads)
+                    result_queue.put(("place", (url, place)))
+                except Exception as e:
+                    result_queue.put(("failed", (url, failure_reason(e))))
+
+                # per-worker pacing, same as the single-page loop
+                throttle(pacer)
+    finally:
+        result_queue.put(("exit", None))
+
+
+def _scrape_pooled(
+    page, search_query, max_places, skip, automode, workers, fields,
+    start_url=None, info=None, known_ids=None, failures=None
 ):
-    seen_urls = set()
+    info = {} if info is None else info
+    info.update(cards=0, end_reached=False)
+
+    seen_ids = set()
+    backlog = []
     unique_seen = 0
+    known = 0
     scraped = 0
+    failed = 0
+    dispatched = 0
+    completed = 0
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        page = browser.new_page()
+    url_queue = queue.Queue()
+    result_queue = queue.Queue()
+    stop = threading.Event()
 
-        try:
-            # ---------- OPEN MAPS ----------
-            page.goto("https://www.google.com/maps", timeout=60000)
-            page.wait_for_selector("input#UGojuc", timeout=15000)
+    # in-flight loads (queued + open), shrinks when the pacer backs off;
+    # capped at one per worker so every halving removes open page loads
+    PACER.set_max_concurrency(workers)
 
-            page.fill("input#UGojuc", search_query)
-            page.keyboard.press("Enter")
+    threads = [
+        threading.Thread(
+            target=detail_worker,
+            args=(url_queue, result_queue, stop, fields),
+            daemon=True
+        )
+        for _ in range(workers)
+    ]
+    alive = len(threads)
 
-            page.wait_for_selector('//a[contains(@href,"/maps/place")]', timeout=20000)
+    for t in threads:
+        t.start()
 
-            idx = 0
-            scrolls = 0
+    try:
+        open_search(page, search_query, start_url)
 
-            while True:
-                cards = page.locator('//a[contains(@href,"/maps/place")]')
-                count = cards.count()
+        scrolls = 0
+        exhausted = False
 
-                # ---------- SCROLL ----------
-                if idx >= count:
-                    scrolls += 1
-                    if scrolls >= CONFIG["MAX_SCROLLS"]:
-                        print("\n[!] No more results available")
-                        break
+        while True:
+            # ---------- RESULTS ----------
+            in_flight = PACER.concurrency_limit()
+            outstanding = dispatched - completed
+            limit_hit = not automode and max_places and dispatched - failed >= max_places
 
-                    page.mouse.wheel(0, 6000)
-                    time.sleep(CONFIG["SCROLL_PAUSE"])
-                    continue
+            # block only while loads are out and there is nothing else
+            # to do: no free slot for the backlog and no list to read
+            can_dispatch = bool(backlog) and outstanding < in_flight and not limit_hit
+            can_collect = not exhausted and not backlog and not limit_hit
+            wait = outstanding > 0 and not can_dispatch and not can_collect
+            try:
+                kind, payload = result_queue.get(timeout=0.5 if wait else 0)
+            except queue.Empty:
+                kind, payload = None, None
 
-                # ---------- CLICK CARD ----------
-                try:
-                    cards.nth(idx).click(force=True)
-                    page.wait_for_timeout(3000)
-                except Exception:
-                    idx += 1
+            if kind == "exit":
+                alive -= 1
+            elif kind == "failed":
+                completed += 1
+                failed += 1
+                if failures is not None:
+                    failures.add(*payload)
+            elif kind == "place":
+                url, place = payload
+                completed += 1
+                scraped += 1
+                if failures is not None:
+                    failures.resolve(url)
+                print(
+                    f"[{scraped}{'/' + str(max_places) if max_places else ''}] "
+                    f"{place.get('Name', 'N/A')}"
+                )
+                yield place
+
+            # ---------- LIMIT ----------
+            if not automode and max_places and scraped >= max_places:
+                print("\n[+] Max limit reached")
+                break
+
+            if alive == 0:
+                print("\n[!] All workers stopped")
+                break
+
+            # ---------- DISPATCH ----------
+            while backlog and (dispatched - completed) < in_flight:
+                if not automode and max_places and dispatched - failed >= max_places:
+                    break
+                url_queue.put(backlog.pop(0))
+                dispatched += 1
+
+            if exhausted:
+                if not backlog and completed >= dispatched:
+                    break
+                continue
+
+            if backlog:
+                continue
+
+            if not automode and max_places and dispatched - failed >= max_places:
+                continue
+
+            # ---------- COLLECT / SCROLL ----------
+            urls = collect_place_urls(page)
+            new_urls = 0
+
+            for url in urls:
+                pid = place_id(url)
+                if pid in seen_ids:
                     continue
 
-                current_url = page.url
+                seen_ids.add(pid)
+                new_urls += 1
 
-                # ---------- DEDUP ----------
-                if current_url in seen_urls:
-                    idx += 1
+                if known_ids and pid in known_ids:
+                    known += 1
+                    info["cards"] = unique_seen + known
+                    print(f"[known] {known}", end="\r")
                     continue
 
-                seen_urls.add(current_url)
                 unique_seen += 1
+                info["cards"] = unique_seen + known
 
-                # ---------- SKIP ----------
                 if unique_seen <= skip:
                     print(f"[skip] {unique_seen}/{skip}", end="\r")
-                    idx += 1
                     continue
 
-                # ---------- LIMIT ----------
-                if not automode and max_places and scraped >= max_places:
-                    print("\n[+] Max limit reached")
-                    break
+                backlog.append(url)
 
-                # ================= DATA EXTRACTION =================
-
-                place_name    = get_text(page, 'h1.DUwDvf')
-                category      = get_text(page, 'button[jsaction*="category"]')
-                rating        = get_text(page, 'div.fontDisplayLarge')
-                raw_reviews = get_text(page, 'button.GQjSyb')
-                reviews_count = parse_reviews_count(raw_reviews)
-
-                address     = get_text(page, 'button[data-item-id="address"] .Io6YTe')
-                plus_code   = get_text(page, 'button[data-item-id="oloc"] .Io6YTe')
-                located_in  = get_text(page, 'button[data-item-id="locatedin"] .Io6YTe')
-
-                phone   = get_text(page, 'button[data-item-id*="phone"] .Io6YTe')
-                website = get_attr(page, 'a[data-item-id*="authority"]', 'href')
-
-                open_status = get_text(page, 'span.ZDu9vd')
-
-
-                latitude, longitude = extract_lat_lng(current_url)
-
-                # ---------- IMAGES ----------
-                image_urls = set()
-
-                imgs = page.locator('button.K4UgGe img[src]')
-                for i in range(min(imgs.count(), CONFIG["MAX_IMAGES"])):
-                    src = clean_image_url(imgs.nth(i).get_attribute("src"))
-                    if src:
-                        image_urls.add(src)
-
-                review_imgs = page.locator('button.Tya61d[style*="background-image"]')
-                for i in range(min(review_imgs.count(), CONFIG["MAX_IMAGES"])):
-                    style = review_imgs.nth(i).get_attribute("style")
-                    if style:
-                        m = re.search(r'url\("(.*?)"\)', style)
-                        if m:
-                            src = clean_image_url(m.group(1))
-                            if src:
-                                image_urls.add(src)
-
-                street_imgs = page.locator('img[src*="streetviewpixels"]')
-                for i in range(min(street_imgs.count(), CONFIG["MAX_IMAGES"])):
-                    src = clean_image_url(street_imgs.nth(i).get_attribute("src"))
-                    if src:
-                        image_urls.add(src)
-
-                # ---------- STAR BREAKDOWN ----------
-                star_breakdown = {}
-                for star in ["5", "4", "3", "2", "1"]:
-                    row = page.locator(f'tr[aria-label^="{star} stars"]')
-                    star_breakdown[star] = (
-                        row.get_attribute("aria-label") if row.count() else "N/A"
-                    )
-
-                # ---------- REVIEWERS ----------
-                reviewers = []
-                review_blocks = page.locator('div.jftiEf')
-                for i in range(review_blocks.count()):
-                    block = review_blocks.nth(i)
-                    reviewers.append({
-                        "name": get_text(block, 'div.d4r55'),
-                        "profile_url": get_attr(block, 'button.al6Kxe', 'data-href')
-                    })
-
-                # ---------- FINAL OBJECT ----------
-                place = {
-                    "Name": place_name,
-                    "Category": category,
-                    "Rating": rating,
-                    "Reviews Count": reviews_count,
-                    "Address": address,
-                    "Plus Code": plus_code,
-                    "Located In": located_in,
-                    "Phone": phone,
-                    "Website": website,
-                    "Open Status": open_status,
-                    "Latitude": latitude,
-                    "Longitude": longitude,
-                    "Maps URL": current_url,
-                    "Images": list(image_urls),
-                    "Star Breakdown": star_breakdown,
-                    "Reviewers": reviewers
-                }
+            if new_urls:
+                continue
 
-                scraped += 1
-                print(
-                    f"[{scraped}{'/' + str(max_places) if max_places else ''}] "
-                    f"{place_name}"
+            if list_end_reached(page):
+                info["end_reached"] = True
+                exhausted = True
+                continue
+
+            scrolls += 1
+            if scrolls >= CONFIG["MAX_SCROLLS"]:
+                print("\n[!] No more results available")
+                exhausted = True
+                continue
+
+            with timed("scroll"):
+                page.mouse.wheel(0, 6000)
+                wait_for_more_cards(page, len(urls))
+
+    finally:
+        stop.set()
+        for _ in threads:
+            url_queue.put(None)
+        for t in threads:
+            t.join(timeout=30)
+
+
+# ================= SCRAPER =================
+
+def _scrape_page(
+    page, traffic, search_query, max_places, skip, automode, fields,
+    start_url=None, info=None, known_ids=None, failures=None
+):
+    # info is filled for callers that need to know whether the result
+    # list was exhausted or cut off (see tiles.py)
+    info = {} if info is None else info
+    info.update(cards=0, end_reached=False)
+
+    seen_ids = set()
+    unique_seen = 0
+    known = 0
+    scraped = 0
+
+    # ---------- OPEN MAPS ----------
+    open_search(page, search_query, start_url)
+
+    idx = 0
+    scrolls = 0
+
+    while True:
+        cards = page.locator('//a[contains(@href,"/maps/place")]')
+        hrefs = collect_place_urls(page)
+        count = len(hrefs)
+
+        # ---------- SCROLL ----------
+        if idx >= count:
+            if list_end_reached(page):
+                info["end_reached"] = True
+                break
+
+            scrolls += 1
+            if scrolls >= CONFIG["MAX_SCROLLS"]:
+                print("\n[!] No more results available")
+                break
+
+            with timed("scroll"):
+                page.mouse.wheel(0, 6000)
+                wait_for_more_cards(page, count)
+            continue
+
+        # ---------- KNOWN (resume) ----------
+        # places already in the output are recognised from the card link,
+        # so they are never clicked again
+        if known_ids and place_id(hrefs[idx]) in known_ids:
+            known += 1
+            info["cards"] = unique_seen + known
+            print(f"[known] {known}", end="\r")
+            idx += 1
+            continue
+
+        # ---------- CLICK CARD ----------
+        prev_name = get_text(page, 'h1.DUwDvf', default="")
+        prev_url = page.url
+
+        try:
+            started = time.monotonic()
+            bytes_before = traffic["bytes"]
+            cards.nth(idx).click(force=True)
+            changed = wait_for_place_change(page, prev_name, prev_url, hrefs[idx])
+            latency = time.monotonic() - started
+        except Exception as e:
+            PACER.report(ok=False)
+            if failures is not None:
+                failures.add(canonical_place_url(hrefs[idx]), f"click: {failure_reason(e)}")
+            idx += 1
+            continue
+
+        record("click_wait", latency)
+        if not changed:
+            # the card of the place already open never switches the
+            # pane; anything else did not load within DETAIL_TIMEOUT
+            if place_id(hrefs[idx]) != place_id(page.url):
+                PACER.report(ok=False)
+                if failures is not None:
+                    failures.add(canonical_place_url(hrefs[idx]), "timeout: detail pane did not load")
+            idx += 1
+            continue
+
+        current_url = page.url
+        pid = place_id(current_url)
+
+        # ---------- DEDUP ----------
+        # viewport and query params differ per scroll position, the
+        # place id does not
+        if pid in seen_ids:
+            idx += 1
+            continue
+
+        seen_ids.add(pid)
+        unique_seen += 1
+        info["cards"] = unique_seen + known
+
+        # ---------- SKIP ----------
+        if unique_seen <= skip:
+            print(f"[skip] {unique_seen}/{skip}", end="\r")
+            idx += 1
+            continue
+
+        # ---------- LIMIT ----------
+        if not automode and max_places and scraped >= max_places:
+            print("\n[+] Max limit reached")
+            break
+
+        place = extract_place(page, current_url, fields)
+        empty = extraction_empty(place)
+        PACER.report(latency, ok=not empty)
+
+        if empty:
+            if failures is not None:
+                failures.add(canonical_place_url(current_url), "empty: no fields on the detail pane")
+            idx += 1
+            continue
+
+        if failures is not None:
+            failures.resolve(current_url)
+
+        PLACE_LATENCIES.append(latency)
+        PLACE_BYTES.append(traffic["bytes"] - bytes_before)
+
+        scraped += 1
+        print(
+            f"[{scraped}{'/' + str(max_places) if max_places else ''}] "
+            f"{place.get('Name', 'N/A')} ({latency:.2f}s)"
+        )
+
+        yield place
+
+        idx += 1
+        throttle()
+
+
+def _scrape_two_phase(
+    page, traffic, search_query, max_places, skip, automode, fields,
+    frontier=None, start_url=None, info=None, known_ids=None, failures=None,
+    resume=True
+):
+    # ---------- PHASE 1: HARVEST ----------
+    urls = harvest_place_urls(page, search_query, start_url, info)
+
+    if frontier is not None:
+        added = frontier.add(urls)
+        print(f"[harvest] {len(urls)} links, {added} new")
+
+    # --skip counts harvested links; frontier "done" links are never reopened
+    pending = urls[skip:]
+    if frontier is not None:
+        harvested = set(urls)
+        pending = [u for u in pending if not frontier.is_done(u)]
+        # tiles pass resume=False: leftovers of other tiles are picked up
+        # once after the last tile (scrape_leftovers)
+        if resume:
+            pending += [u for u in frontier.pending() if u not in harvested]
+
+    if known_ids:
+        pending = [u for u in pending if place_id(u) not in known_ids]
+
+    # ---------- PHASE 2: DETAILS ----------
+    yield from _fetch_details(
+        page, traffic, pending, max_places, automode, fields, frontier, failures
+    )
+
+
+def _fetch_details(
+    page, traffic, pending, max_places, automode, fields,
+    frontier=None, failures=None
+):
+    scraped = 0
+
+    for url in pending:
+        if not automode and max_places and scraped >= max_places:
+            print("\n[+] Max limit reached")
+            break
+
+        try:
+            place = fetch_place(page, url, fields, traffic)
+        except Exception as e:
+            if frontier is not None:
+                frontier.mark(url, "failed")
+            if failures is not None:
+                failures.add(url, failure_reason(e))
+            continue
+
+        if failures is not None:
+            failures.resolve(url)
+
+        scraped += 1
+        print(
+            f"[{scraped}{'/' + str(max_places) if max_places else ''}] "
+            f"{place.get('Name', 'N/A')} ({PLACE_LATENCIES[-1]:.2f}s)"
+        )
+
+        yield place
+
+        if frontier is not None:
+            frontier.mark(url, "done")
+
+        throttle()
+
+
+def scrape_google_maps(
+    search_query,
+    max_places=None,
+    skip=0,
+    automode=False,
+    workers=1,
+    fields=None,
+    browser=None,
+    page=None,
+    start_url=None,
+    info=None,
+    two_phase=False,
+    frontier=None,
+    known_ids=None,
+    failures=None,
+    search_retries=None,
+    retry_rounds=None,
+    resume=True
+):
+    # page    -> reuse an already warm page (e.g. across many queries)
+    # browser -> reuse a running browser, fresh context per query
+    options = dict(
+        max_places=max_places,
+        skip=skip,
+        automode=automode,
+        workers=workers,
+        fields=fields,
+        start_url=start_url,
+        info=info,
+        two_phase=two_phase,
+        frontier=frontier,
+        known_ids=known_ids,
+        failures=failures,
+        search_retries=search_retries,
+        retry_rounds=retry_rounds,
+        resume=resume
+    )
+
+    if page is None:
+        if browser is None:
+            with browser_session() as browser:
+                yield from scrape_google_maps(search_query, browser=browser, **options)
+            return
+
+        context = browser.new_context()
+        try:
+            yield from scrape_google_maps(
+                search_query, page=context.new_page(), **options
+            )
+        finally:
+            context.close()
+        return
+
+    traffic = prepare_page(page)
+
+    def crawl():
+        if two_phase:
+            return _scrape_two_phase(
+                page, traffic, search_query, max_places, skip, automode, fields,
+                frontier, start_url, info, known_ids, failures, resume
+            )
+
+        if workers > 1:
+            return _scrape_pooled(
+                page, search_query, max_places, skip, automode, workers, fields,
+                start_url, info, known_ids, failures
+            )
+
+        return _scrape_page(
+            page, traffic, search_query, max_places, skip, automode, fields,
+            start_url, info, known_ids, failures
+        )
+
+    # ---------- SEARCH RETRIES ----------
+    # a result list that never loaded is retried with backoff instead of
+    # ending the run (tiles pass 0: an empty tile never shows a list)
+    if search_retries is None:
+        search_retries = CONFIG["SEARCH_RETRIES"]
+
+    for attempt in range(search_retries + 1):
+        yielded = False
+        try:
+            for place in crawl():
+                yielded = True
+                yield place
+            break
+        except SearchFailed:
+            if yielded or attempt == search_retries:
+                raise
+
+            PACER.report(ok=False)
+            wait = CONFIG["RETRY_BACKOFF"] * 2 ** attempt
+            print(f"\n[!] Results did not load, retrying in {wait:.0f}s")
+            time.sleep(wait)
+
+    # ---------- FAILED PLACES ----------
+    # tiles pass retry_rounds=0 and retry once after the last tile
+    if failures is not None:
+        yield from retry_failed(
+            page, failures, fields, traffic, retry_rounds,
+            max_attempts=CONFIG["RETRY_MAX_ATTEMPTS"]
+        )
+
+
+def scrape_leftovers(
+    frontier=None, failures=None, fields=None, known_ids=None,
+    browser=None, page=None
+):
+    """Tiles: open frontier links no tile finished, then retry failures"""
+
+    if page is None:
+        if browser is None:
+            with browser_session() as browser:
+                yield from scrape_leftovers(
+                    frontier, failures, fields, known_ids, browser=browser
                 )
+            return
 
+        context = browser.new_context()
+        try:
+            yield from scrape_leftovers(
+                frontier, failures, fields, known_ids, page=context.new_page()
+            )
+        finally:
+            context.close()
+        return
+
+    traffic = prepare_page(page)
+
+    if frontier is not None:
+        # links that failed this run wait for the backed-off retry below
+        pending = [
+            u for u in frontier.pending()
+            if not (failures is not None and u in failures)
+            and not (known_ids and place_id(u) in known_ids)
+        ]
+        if pending:
+            print(f"\n[frontier] {len(pending)} links left from earlier tiles")
+            yield from _fetch_details(
+                page, traffic, pending, None, True, fields, frontier, failures
+            )
+
+    if failures is not None:
+        yield from retry_failed(
+            page, failures, fields, traffic,
+            max_attempts=CONFIG["RETRY_MAX_ATTEMPTS"]
+        )
+
+
+# ================= FAILURE RETRIES =================
+
+def retry_failed(
+    page, failures, fields=None, traffic=None, rounds=None,
+    max_attempts=None, wait_first=True
+):
+    """Re-open queued failures by link, backing off between rounds"""
+
+    if rounds is None:
+        rounds = CONFIG["RETRY_ROUNDS"]
+
+    for r in range(rounds):
+        urls = failures.pending(max_attempts)
+        if not urls:
+            return
+
+        print(f"\n[retry] {len(urls)} failed places, round {r + 1}/{rounds}")
+        if r or wait_first:
+            time.sleep(CONFIG["RETRY_BACKOFF"] * 2 ** r)
+
+        for url in urls:
+            try:
+                place = fetch_place(page, url, fields, traffic)
+            except Exception as e:
+                failures.add(url, failure_reason(e))
+            else:
+                failures.resolve(url)
+                print(f"[retry] {place.get('Name', 'N/A')}")
                 yield place
 
-                idx += 1
-                throttle()
+            throttle()
+
 
+def scrape_failed(failures, fields=None, browser=None, page=None, rounds=None):
+    """--retry-failed: open only the places in the failure queue"""
+
+    if page is None:
+        if browser is None:
+            with browser_session() as browser:
+                yield from scrape_failed(failures, fields, browser=browser, rounds=rounds)
+            return
+
+        context = browser.new_context()
+        try:
+            yield from scrape_failed(
+                failures, fields, page=context.new_page(), rounds=rounds
+            )
         finally:
-            browser.close()
\ No newline at end of file
+            context.close()
+        return
+
+    # every open failure, however often it was tried before
+    yield from retry_failed(
+        page, failures, fields, prepare_page(page), rounds, wait_first=False
+    )
@@ -0,0 +1,589 @@
+from playwright.async_api import async_playwright, TimeoutError
+import asyncio
+import queue
+import threading
+import time
+
+from google import (
+    CONFIG,
+    PLACE_LATENCIES,
+    PLACE_BYTES,
+    PLACE_CHANGED_JS,
+    CARDS_GREW_JS,
+    END_OF_LIST,
+    PLACE_SELECTORS,
+    EXTRACT_JS,
+    selectors_for,
+    build_place,
+    should_block,
+    count_traffic,
+    PAGE_TRAFFIC,
+    PACER,
+    SearchFailed,
+    pause_seconds,
+    extraction_empty,
+    failure_reason,
+    canonical_place_url,
+)
+from urllib.parse import quote_plus
+
+from utils import place_id
+from metrics import record, timed
+
+# ================= HELPERS =================
+
+async def throttle():
+    """Human-like random delay (non-blocking)"""
+    delay = pause_seconds()
+    await asyncio.sleep(delay)
+    record("throttle", delay)
+
+
+async def get_text(node, selector, default="N/A"):
+    try:
+        loc = node.locator(selector)
+        if await loc.count():
+            return (await loc.first.inner_text()).strip()
+    except Exception:
+        pass
+    return default
+
+
+async def get_attr(node, selector, attr, default="N/A"):
+    try:
+        loc = node.locator(selector)
+        if await loc.count():
+            val = await loc.first.get_attribute(attr)
+            return val if val else default
+    except Exception:
+        pass
+    return default
+
+
+async def prepare_page(page):
+    """Attach request blocking and byte counting, returns the page's counters"""
+
+    if page in PAGE_TRAFFIC:
+        return PAGE_TRAFFIC[page]
+
+    traffic = {"bytes": 0, "requests": 0, "blocked": 0}
+    PAGE_TRAFFIC[page] = traffic
+
+    if CONFIG["BLOCK_RESOURCES"]:
+        async def route_filter(route):
+            request = route.request
+            if should_block(request.resource_type, request.url):
+                count_traffic(traffic, "blocked")
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await page.route("**/*", route_filter)
+
+    def loading_finished(event):
+        count_traffic(traffic, "requests")
+        count_traffic(traffic, "bytes", int(event.get("encodedDataLength", 0)))
+
+    try:
+        cdp = await page.context.new_cdp_session(page)
+        cdp.on("Network.loadingFinished", loading_finished)
+        await cdp.send("Network.enable")
+    except Exception:
+        pass
+
+    return traffic
+
+
+async def wait_for_place_change(page, prev_name, prev_url, card_href):
+    try:
+        await page.wait_for_function(
+            PLACE_CHANGED_JS,
+            arg=[prev_name, prev_url, card_href],
+            timeout=CONFIG["DETAIL_TIMEOUT"] * 1000
+        )
+        return True
+    except TimeoutError:
+        return False
+
+
+async def wait_for_more_cards(page, prev_count):
+    try:
+        await page.wait_for_function(
+            CARDS_GREW_JS,
+            arg=prev_count,
+            timeout=CONFIG["SCROLL_PAUSE"] * 1000
+        )
+        return True
+    except TimeoutError:
+        return False
+
+
+async def list_end_reached(page):
+    try:
+        return await page.locator(END_OF_LIST).count() > 0
+    except Exception:
+        return False
+
+
+async def open_search(page, search_query, start_url=None):
+    try:
+        await _open_search(page, search_query, start_url)
+    except TimeoutError as e:
+        raise SearchFailed(f"results did not load for {search_query!r}") from e
+
+
+async def _open_search(page, search_query, start_url=None):
+
+    if start_url:
+        # explicit viewport, e.g. /maps/search/<query>/@lat,lng,zoomz
+        await page.goto(start_url, timeout=60000)
+    elif "google.com/maps" in page.url:
+        await page.goto(
+            "https://www.google.com/maps/search/" + quote_plus(search_query),
+            timeout=60000
+        )
+    else:
+        await page.goto("https://www.google.com/maps", timeout=60000)
+        await page.wait_for_selector("input#UGojuc", timeout=15000)
+
+        await page.fill("input#UGojuc", search_query)
+        await page.keyboard.press("Enter")
+
+    await page.wait_for_selector('//a[contains(@href,"/maps/place")]', timeout=20000)
+
+
+# ================= EXTRACTION =================
+
+async def _read_locators(root, spec):
+
+    kind = spec["kind"]
+
+    if kind == "group":
+        return await _read_all_locators(root, spec["fields"])
+
+    if kind == "text":
+        return await get_text(root, spec["css"], default=None)
+
+    if kind == "attr":
+        return await get_attr(root, spec["css"], spec["attr"], default=None)
+
+    loc = root.locator(spec["css"])
+    count = await loc.count()
+
+    if kind == "each":
+        return list(await asyncio.gather(*(
+            _read_all_locators(loc.nth(i), spec["fields"]) for i in range(count)
+        )))
+
+    return list(await asyncio.gather(*(
+        loc.nth(i).get_attribute(spec["attr"])
+        for i in range(min(count, CONFIG["MAX_IMAGES"]))
+    )))
+
+
+async def _read_all_locators(root, fields):
+    values = await asyncio.gather(*(
+        _read_locators(root, spec) for spec in fields.values()
+    ))
+    return dict(zip(fields.keys(), values))
+
+
+async def read_place_fields(page, fields=PLACE_SELECTORS):
+
+    if CONFIG["EXTRACT_MODE"] == "evaluate":
+        with timed("select.evaluate"):
+            return await page.evaluate(
+                EXTRACT_JS,
+                {"fields": fields, "limit": CONFIG["MAX_IMAGES"]}
+            )
+
+    # selectors run concurrently here, so they share one timer
+    with timed("select.locators"):
+        return await _read_all_locators(page, fields)
+
+
+async def extract_place(page, current_url, fields=None):
+    with timed("extract"):
+        selectors = selectors_for(fields)
+        raw = await read_place_fields(page, selectors) if selectors else {}
+        return build_place(raw, current_url, fields)
+
+
+async def fetch_place(page, url, fields=None):
+    """Open a place link directly and extract it"""
+
+    started = time.monotonic()
+
+    try:
+        await page.goto(url, timeout=60000)
+        await page.wait_for_selector('h1.DUwDvf', timeout=15000)
+    except Exception:
+        PACER.report(ok=False)
+        raise
+
+    PLACE_LATENCIES.append(time.monotonic() - started)
+    record("goto", PLACE_LATENCIES[-1])
+
+    place = await extract_place(page, page.url, fields)
+    PACER.report(PLACE_LATENCIES[-1], ok=not extraction_empty(place))
+    return place
+
+
+# ================= SCRAPER =================
+
+async def _scrape_page(
+    page, search_query, max_places, skip, automode, fields, known_ids=None,
+    start_url=None, failures=None, info=None
+):
+    info = {} if info is None else info
+    info.update(cards=0, end_reached=False)
+
+    traffic = await prepare_page(page)
+
+    seen_ids = set()
+    unique_seen = 0
+    known = 0
+    scraped = 0
+
+    with timed("open_search"):
+        await open_search(page, search_query, start_url)
+
+    idx = 0
+    scrolls = 0
+
+    while True:
+        cards = page.locator('//a[contains(@href,"/maps/place")]')
+        hrefs = await page.eval_on_selector_all(
+            'a[href*="/maps/place"]',
+            "els => els.map(e => e.href)"
+        )
+        count = len(hrefs)
+
+        # ---------- SCROLL ----------
+        if idx >= count:
+            if await list_end_reached(page):
+                info["end_reached"] = True
+                break
+
+            scrolls += 1
+            if scrolls >= CONFIG["MAX_SCROLLS"]:
+                print("\n[!] No more results available")
+                break
+
+            with timed("scroll"):
+                await page.mouse.wheel(0, 6000)
+                await wait_for_more_cards(page, count)
+            continue
+
+        # ---------- KNOWN (resume) ----------
+        if known_ids and place_id(hrefs[idx]) in known_ids:
+            known += 1
+            info["cards"] = unique_seen + known
+            print(f"[known] {known}", end="\r")
+            idx += 1
+            continue
+
+        # ---------- CLICK CARD ----------
+        prev_name = await get_text(page, 'h1.DUwDvf', default="")
+        prev_url = page.url
+
+        try:
+            started = time.monotonic()
+            bytes_before = traffic["bytes"]
+            await cards.nth(idx).click(force=True)
+            changed = await wait_for_place_change(page, prev_name, prev_url, hrefs[idx])
+            latency = time.monotonic() - started
+        except Exception as e:
+            PACER.report(ok=False)
+            if failures is not None:
+                failures.add(canonical_place_url(hrefs[idx]), f"click: {failure_reason(e)}")
+            idx += 1
+            continue
+
+        record("click_wait", latency)
+        if not changed:
+            if place_id(hrefs[idx]) != place_id(page.url):
+                PACER.report(ok=False)
+                if failures is not None:
+                    failures.add(canonical_place_url(hrefs[idx]), "timeout: detail pane did not load")
+            idx += 1
+            continue
+
+        current_url = page.url
+        pid = place_id(current_url)
+
+        # ---------- DEDUP ----------
+        if pid in seen_ids:
+            idx += 1
+            continue
+
+        seen_ids.add(pid)
+        unique_seen += 1
+        info["cards"] = unique_seen + known
+
+        # ---------- SKIP ----------
+        if unique_seen <= skip:
+            print(f"[skip] {unique_seen}/{skip}", end="\r")
+            idx += 1
+            continue
+
+        # ---------- LIMIT ----------
+        if not automode and max_places and scraped >= max_places:
+            print("\n[+] Max limit reached")
+            break
+
+        place = await extract_place(page, current_url, fields)
+        empty = extraction_empty(place)
+        PACER.report(latency, ok=not empty)
+
+        if empty:
+            if failures is not None:
+                failures.add(canonical_place_url(current_url), "empty: no fields on the detail pane")
+            idx += 1
+            continue
+
+        if failures is not None:
+            failures.resolve(current_url)
+
+        PLACE_LATENCIES.append(latency)
+        PLACE_BYTES.append(traffic["bytes"] - bytes_before)
+
+        scraped += 1
+        print(
+            f"[{scraped}{'/' + str(max_places) if max_places else ''}] "
+            f"{place.get('Name', 'N/A')} ({latency:.2f}s)"
+        )
+
+        yield place
+
+        idx += 1
+        await throttle()
+
+
+async def scrape_google_maps_async(
+    search_query,
+    max_places=None,
+    skip=0,
+    automode=False,
+    browser=None,
+    fields=None,
+    page=None,
+    known_ids=None,
+    start_url=None,
+    failures=None,
+    search_retries=None,
+    info=None
+):
+    # page    -> reuse an already warm page (e.g. across many queries)
+    # browser -> reuse a running browser, fresh context per query, so
+    #            several queries can share one Chromium in one event loop
+    options = dict(
+        fields=fields,
+        known_ids=known_ids,
+        start_url=start_url,
+        failures=failures,
+        search_retries=search_retries,
+        info=info
+    )
+
+    if page is not None:
+        if search_retries is None:
+            search_retries = CONFIG["SEARCH_RETRIES"]
+
+        # a result list that never loaded is retried with backoff
+        for attempt in range(search_retries + 1):
+            yielded = False
+            try:
+                async for place in _scrape_page(
+                    page, search_query, max_places, skip, automode, fields, known_ids,
+                    start_url, failures, info
+                ):
+                    yielded = True
+                    yield place
+                break
+            except SearchFailed:
+                if yielded or attempt == search_retries:
+                    raise
+
+                PACER.report(ok=False)
+                wait = CONFIG["RETRY_BACKOFF"] * 2 ** attempt
+                print(f"\n[!] Results did not load, retrying in {wait:.0f}s")
+                await asyncio.sleep(wait)
+
+        if failures is not None:
+            async for place in retry_failed(
+                page, failures, fields, max_attempts=CONFIG["RETRY_MAX_ATTEMPTS"]
+            ):
+                yield place
+        return
+
+    if browser is not None:
+        context = await browser.new_context()
+        try:
+            async for place in scrape_google_maps_async(
+                search_query, max_places, skip, automode,
+                page=await context.new_page(), **options
+            ):
+                yield place
+        finally:
+            await context.close()
+        return
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=CONFIG["HEADLESS"])
+        try:
+            async for place in scrape_google_maps_async(
+                search_query, max_places, skip, automode,
+                browser=browser, **options
+            ):
+                yield place
+        finally:
+            await browser.close()
+
+
+async def retry_failed(page, failures, fields=None, rounds=None, max_attempts=None):
+    """Re-open queued failures by link, backing off between rounds"""
+
+    if rounds is None:
+        rounds = CONFIG["RETRY_ROUNDS"]
+
+    for r in range(rounds):
+        urls = failures.pending(max_attempts)
+        if not urls:
+            return
+
+        print(f"\n[retry] {len(urls)} failed places, round {r + 1}/{rounds}")
+        await asyncio.sleep(CONFIG["RETRY_BACKOFF"] * 2 ** r)
+
+        for url in urls:
+            try:
+                place = await fetch_place(page, url, fields)
+            except Exception as e:
+                failures.add(url, failure_reason(e))
+            else:
+                failures.resolve(url)
+                print(f"[retry] {place.get('Name', 'N/A')}")
+                yield place
+
+            await throttle()
+
+
+# ================= SYNC BRIDGE =================
+
+def iterate_async(agen, prefetch=4, loop=None):
+    """Consume an async generator from sync code on a background event loop"""
+
+    items = queue.Queue(maxsize=max(prefetch, 1))
+    finished = threading.Event()
+    error = []
+
+    own_loop = loop is None
+    if own_loop:
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+    async def put(item):
+        # polled instead of a blocking put in an executor thread, so a
+        # cancel always gets through and no thread is left waiting
+        while True:
+            try:
+                items.put_nowait(item)
+                return
+            except queue.Full:
+                await asyncio.sleep(0.05)
+
+    async def pump():
+        try:
+            async for item in agen:
+                await put(item)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            error.append(e)
+        finally:
+            try:
+                await agen.aclose()
+            finally:
+                finished.set()
+
+    async def start():
+        return asyncio.ensure_future(pump())
+
+    task = asyncio.run_coroutine_threadsafe(start(), loop).result()
+
+    try:
+        while True:
+            try:
+                item = items.get(timeout=0.1)
+            except queue.Empty:
+                if finished.is_set() and items.empty():
+                    break
+                continue
+            yield item
+
+        if error:
+            raise error[0]
+    finally:
+        if not finished.is_set():
+            loop.call_soon_threadsafe(task.cancel)
+
+            # wait for the generator's own cleanup (context / browser close)
+            while not finished.wait(0.1):
+                try:
+                    while True:
+                        items.get_nowait()
+                except queue.Empty:
+                    pass
+
+        if own_loop:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+
+class AsyncBrowserSession:
+    """One event loop + one Chromium shared by many queries (sync facade)"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+        self.playwright = None
+        self.browser = self.run(self._launch())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    async def _launch(self):
+        self.playwright = await async_playwright().start()
+        return await self.playwright.chromium.launch(headless=CONFIG["HEADLESS"])
+
+    async def _shutdown(self):
+        try:
+            await self.browser.close()
+        finally:
+            await self.playwright.stop()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def new_page(self):
+        return self.run(self.browser.new_page())
+
+    def iterate(self, agen, prefetch=4):
+        return iterate_async(agen, prefetch, loop=self.loop)
+
+    def close(self):
+        try:
+            if self.browser is not None:
+                self.run(self._shutdown())
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
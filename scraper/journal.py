@@ -0,0 +1,276 @@
+import os
+import json
+import time
+from openpyxl import Workbook, load_workbook
+from excel import sanitize_name, make_place_key, is_duplicate, PlaceIndex
+from utils import place_id, repair_tail
+from sink import Sink
+
+# ================= JOURNAL WRITER =================
+#
+# Append-only JSONL journal used as the primary sink.
+# Every accepted row is one line in data/<query>.jsonl; the .xlsx file
+# is rebuilt from the journal in a single pass by compact().
+# compact() records the signature of the workbook it wrote
+# (data/<query>.compacted.json); when the .xlsx changed since (a run
+# without --journal added rows), its missing rows are imported first.
+
+
+class JournalWriter(Sink):
+
+    def __init__(
+        self,
+        search_query: str,
+        base_folder: str = "data",
+        fsync_every: int = 10,
+        fsync_interval: float = 5.0,
+        shared_ids: PlaceIndex = None
+    ):
+
+        os.makedirs(base_folder, exist_ok=True)
+
+        safe_query = sanitize_name(search_query)
+        self.path = os.path.join(base_folder, f"{safe_query}.jsonl")
+        self.xlsx_path = os.path.join(base_folder, f"{safe_query}.xlsx")
+        self.mark_path = os.path.join(base_folder, f"{safe_query}.compacted.json")
+
+        self.seen_places = PlaceIndex()
+        self.seen_ids = PlaceIndex()
+        self.shared_ids = shared_ids
+        self.headers = []
+        self.rows = 0
+
+        self.fsync_every = max(int(fsync_every), 1)
+        self.fsync_interval = fsync_interval
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+        if os.path.exists(self.path):
+            repair_tail(self.path)
+            self._replay()
+            if os.path.exists(self.xlsx_path) and self._workbook_changed():
+                self._import_workbook()
+        elif os.path.exists(self.xlsx_path):
+            self._import_workbook()
+
+        self.fh = open(self.path, "a", encoding="utf-8")
+
+    # ================= CONTEXT MANAGER =================
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # ================= INTERNAL =================
+
+    def _track(self, data: dict):
+
+        for k in data.keys():
+            if k not in self.headers:
+                self.headers.append(k)
+
+        name = data.get("Name")
+        address = data.get("Address")
+        if name and address:
+            self.seen_places.add(make_place_key(name, address))
+
+        pid = place_id(data.get("Maps URL") or "")
+        if pid:
+            self.seen_ids.add(pid)
+
+        self.rows += 1
+
+    def _replay(self):
+
+        for data in self.iter_rows():
+            self._track(data)
+
+    def _workbook_signature(self) -> dict:
+        st = os.stat(self.xlsx_path)
+        return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+    def _workbook_changed(self) -> bool:
+
+        try:
+            with open(self.mark_path, encoding="utf-8") as f:
+                return json.load(f) != self._workbook_signature()
+        except (OSError, ValueError):
+            return True
+
+    def _save_mark(self):
+
+        tmp_path = self.mark_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._workbook_signature(), f)
+        os.replace(tmp_path, self.mark_path)
+
+    def _import_workbook(self):
+
+        # seeds a new journal from an .xlsx written by ExcelWriter, or
+        # appends the rows a later plain run added to it
+        wb = load_workbook(self.xlsx_path, read_only=True)
+        ws = wb.active
+        merging = self.rows > 0
+
+        with open(self.path, "a", encoding="utf-8") as f:
+            headers = None
+            for row in ws.iter_rows(values_only=True):
+                if headers is None:
+                    headers = [h for h in row if h]
+                    continue
+
+                data = {
+                    h: ("" if v is None else v)
+                    for h, v in zip(headers, row)
+                }
+
+                if merging:
+                    if not data.get("Name") or not data.get("Address"):
+                        continue
+                    if is_duplicate(data, self.seen_ids, self.seen_places):
+                        continue
+
+                f.write(json.dumps(data, ensure_ascii=False) + "\n")
+                self._track(data)
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        wb.close()
+
+    def _sync_due(self) -> bool:
+
+        if self.pending >= self.fsync_every:
+            return True
+
+        if self.fsync_interval is not None and self.fsync_interval >= 0:
+            return time.monotonic() - self.last_sync >= self.fsync_interval
+
+        return False
+
+    # ================= PUBLIC METHODS =================
+
+    def iter_rows(self):
+
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def set_columns(self, columns):
+        # compact() writes these first, columns of older rows after them
+        self.headers = list(columns) + [h for h in self.headers if h not in columns]
+
+    def seen(self, data: dict) -> bool:
+        return is_duplicate(data, self.seen_ids, self.seen_places, self.shared_ids)
+
+    def write_batch(self, rows) -> int:
+        return sum(self.write_row(data) for data in rows)
+
+    def write_row(self, data: dict) -> bool:
+
+        name = data.get("Name")
+        address = data.get("Address")
+
+        if not name or not address:
+            return False
+
+        if self.seen(data):
+            return False
+
+        self.fh.write(json.dumps(data, ensure_ascii=False, default=str) + "\n")
+        self._track(data)
+        self.pending += 1
+
+        if self._sync_due():
+            self.flush()
+
+        return True
+
+    def flush(self):
+
+        if self.fh.closed:
+            return
+
+        self.fh.flush()
+        if self.pending:
+            os.fsync(self.fh.fileno())
+            self.pending = 0
+
+        self.last_sync = time.monotonic()
+
+    def update_rows(self, updates: dict) -> int:
+        """Overwrite cells of journalled rows, updates = {place id: {column: value}}"""
+
+        self.flush()
+        if not updates:
+            return 0
+
+        for values in updates.values():
+            for k in values:
+                if k not in self.headers:
+                    self.headers.append(k)
+
+        # the journal is rewritten once so replays and compact() see the
+        # new values; the old file is kept until the new one is synced
+        updated = 0
+        tmp_path = self.path + ".tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for data in self.iter_rows():
+                values = updates.get(place_id(data.get("Maps URL") or ""))
+                if values:
+                    data.update(values)
+                    updated += 1
+                f.write(json.dumps(data, ensure_ascii=False, default=str) + "\n")
+
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.fh.close()
+        os.replace(tmp_path, self.path)
+        self.fh = open(self.path, "a", encoding="utf-8")
+
+        return updated
+
+    def compact(self) -> str:
+
+        # single pass, write-only workbook; replaced atomically
+        self.flush()
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Places")
+        ws.append(self.headers)
+
+        for data in self.iter_rows():
+            ws.append([data.get(h, "") for h in self.headers])
+
+        tmp_path = self.xlsx_path + ".tmp"
+        wb.save(tmp_path)
+        os.replace(tmp_path, self.xlsx_path)
+        self._save_mark()
+
+        return self.xlsx_path
+
+    def close(self):
+
+        if self.fh.closed:
+            return
+
+        self.flush()
+        self.fh.close()
+        self.compact()
+
+    def get_row_count(self) -> int:
+        return self.rows
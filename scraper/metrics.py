@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+# ================= STAGE METRICS =================
+#
+# Run-wide timing per stage of the scrape / write path. Each stage keeps
+# count, sum and max exactly plus a bounded sample for the quantiles, so
+# long --auto runs do not grow without limit.
+# Exported as JSON at the end of a run and, while running, as a
+# Prometheus text file that node_exporter's textfile collector can read.
+
+SAMPLE_SIZE = 10000
+
+
+class Histogram:
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, seconds: float):
+
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+        # reservoir sampling keeps an unbiased sample of every value seen
+        if len(self.samples) < SAMPLE_SIZE:
+            self.samples.append(seconds)
+        else:
+            i = random.randrange(self.count)
+            if i < SAMPLE_SIZE:
+                self.samples[i] = seconds
+
+    def merge(self, count: int, total: float, maximum: float, samples: list):
+        """Fold in another process's histogram (see export_stages)"""
+
+        if not count:
+            return
+
+        # the merged sample keeps each side in proportion to its count
+        mine = round(SAMPLE_SIZE * self.count / (self.count + count))
+        self.samples = (
+            random.sample(self.samples, min(mine, len(self.samples)))
+            + random.sample(samples, min(SAMPLE_SIZE - mine, len(samples)))
+        )
+
+        self.count += count
+        self.total += total
+        self.max = max(self.max, maximum)
+
+    def quantile(self, q: float) -> float:
+
+        if not self.samples:
+            return 0.0
+
+        ordered = sorted(self.samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "p50": round(self.quantile(0.50), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "max": round(self.max, 6),
+        }
+
+
+STAGES = {}
+STAGES_LOCK = threading.Lock()
+
+
+def record(stage: str, seconds: float):
+
+    with STAGES_LOCK:
+        hist = STAGES.get(stage)
+        if hist is None:
+            hist = STAGES[stage] = Histogram()
+        hist.add(seconds)
+
+
+@contextmanager
+def timed(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - started)
+
+
+def snapshot() -> dict:
+
+    with STAGES_LOCK:
+        return {stage: hist.summary() for stage, hist in sorted(STAGES.items())}
+
+
+def export_stages() -> dict:
+    """Raw histograms, picklable, for merge_stages() in another process"""
+
+    with STAGES_LOCK:
+        return {
+            stage: (hist.count, hist.total, hist.max, list(hist.samples))
+            for stage, hist in STAGES.items()
+        }
+
+
+def merge_stages(stages: dict):
+
+    with STAGES_LOCK:
+        for stage, raw in stages.items():
+            hist = STAGES.get(stage)
+            if hist is None:
+                hist = STAGES[stage] = Histogram()
+            hist.merge(*raw)
+
+
+# ================= EXPORT =================
+
+def _write_atomic(path: str, text: str):
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_json(path: str, extra: dict = None):
+
+    data = {"generated_at": time.time(), "stages": snapshot()}
+    if extra:
+        data.update(extra)
+
+    _write_atomic(path, json.dumps(data, indent=2))
+
+
+def prometheus_text(extra: dict = None) -> str:
+
+    lines = [
+        "# HELP nirgeo_stage_seconds Time spent per scraper / writer stage.",
+        "# TYPE nirgeo_stage_seconds summary",
+    ]
+    maxima = [
+        "# HELP nirgeo_stage_seconds_max Slowest single call per stage.",
+        "# TYPE nirgeo_stage_seconds_max gauge",
+    ]
+
+    for stage, s in snapshot().items():
+        label = f'stage="{stage}"'
+        lines.append(f'nirgeo_stage_seconds{{{label},quantile="0.5"}} {s["p50"]}')
+        lines.append(f'nirgeo_stage_seconds{{{label},quantile="0.95"}} {s["p95"]}')
+        lines.append(f"nirgeo_stage_seconds_sum{{{label}}} {s['sum']}")
+        lines.append(f"nirgeo_stage_seconds_count{{{label}}} {s['count']}")
+        maxima.append(f"nirgeo_stage_seconds_max{{{label}}} {s['max']}")
+
+    lines += maxima
+
+    for name, value in (extra or {}).items():
+        lines.append(f"# TYPE nirgeo_{name} gauge")
+        lines.append(f"nirgeo_{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str, extra: dict = None):
+    _write_atomic(path, prometheus_text(extra))
+
+
+class PrometheusReporter:
+    """Rewrites a Prometheus text file every interval seconds (background thread)"""
+
+    def __init__(self, path: str, interval: float = 15.0, extra=None):
+
+        self.path = path
+        self.interval = interval
+        self.extra = extra or (lambda: {})
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                write_prometheus(self.path, self.extra())
+            except OSError:
+                pass
+
+    def stop(self):
+
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+        # one last write so the file matches the final numbers
+        write_prometheus(self.path, self.extra())
@@ -0,0 +1,138 @@
+import random
+import threading
+from collections import deque
+
+# ================= ADAPTIVE PACING =================
+#
+# AIMD controller for the pause between place loads and, in pool mode,
+# for how many loads may be in flight at once.
+#   healthy load        -> delay shrinks by a fixed step, concurrency
+#                          grows by 1/concurrency (additive)
+#   burst of bad loads  -> delay doubles, concurrency halves
+#                          (multiplicative)
+# A load is bad when it timed out, failed, came back empty or took far
+# longer than the running average. One controller is shared by every
+# worker of a process, so they all speed up and back off together.
+
+
+class AdaptivePacer:
+
+    def __init__(
+        self,
+        start: float = 1.0,
+        floor: float = 0.2,
+        ceiling: float = 15.0,
+        max_concurrency: int = 1,
+        step: float = 0.05,
+        window: int = 20,
+        error_rate: float = 0.2,
+        slow_factor: float = 2.5
+    ):
+        self.lock = threading.Lock()
+
+        self.step = step
+        self.window = window
+        self.error_rate = error_rate
+        self.slow_factor = slow_factor
+
+        self.configure(start, floor, ceiling, max_concurrency)
+
+    def configure(self, start: float, floor: float, ceiling: float, max_concurrency: int = 1):
+
+        with self.lock:
+            self.floor = max(float(floor), 0.0)
+            self.ceiling = max(float(ceiling), self.floor)
+            self.delay = min(max(float(start), self.floor), self.ceiling)
+
+            self.max_concurrency = max(int(max_concurrency), 1)
+            self.concurrency = float(self.max_concurrency)
+
+            self.outcomes = deque(maxlen=self.window)
+            self.baseline = None
+            self.since_backoff = 0
+
+            self.loads = 0
+            self.failures = 0
+            self.backoffs = 0
+            self.merged = 0
+
+    def set_max_concurrency(self, limit: int):
+
+        with self.lock:
+            self.max_concurrency = max(int(limit), 1)
+            self.concurrency = float(self.max_concurrency)
+
+    # ---------- FEEDBACK ----------
+
+    def report(self, latency: float = None, ok: bool = True):
+        """Outcome of one place load (latency in seconds, None if it failed)"""
+
+        with self.lock:
+            self.loads += 1
+            self.since_backoff += 1
+            if not ok:
+                self.failures += 1
+
+            slow = False
+            if ok and latency is not None:
+                if self.baseline is None:
+                    self.baseline = latency
+                else:
+                    slow = latency > self.baseline * self.slow_factor
+                    self.baseline = 0.9 * self.baseline + 0.1 * latency
+
+            bad = not ok or slow
+            self.outcomes.append(bad)
+
+            # a single failure is noise; error_rate of the window is a trend
+            trouble = sum(self.outcomes) / self.window >= self.error_rate
+
+            if bad and trouble:
+                # at most one backoff per quarter window, so one burst
+                # does not double the delay many times over
+                if self.since_backoff >= max(self.window // 4, 1):
+                    self.delay = min(max(self.delay * 2, self.floor + self.step), self.ceiling)
+                    self.concurrency = max(self.concurrency / 2, 1.0)
+                    self.since_backoff = 0
+                    self.backoffs += 1
+
+            elif not bad and not trouble:
+                self.delay = max(self.delay - self.step, self.floor)
+                self.concurrency = min(
+                    self.concurrency + 1 / self.concurrency,
+                    float(self.max_concurrency)
+                )
+
+    # ---------- PACING ----------
+
+    def next_delay(self) -> float:
+        # +-25% jitter keeps the pauses human-like
+        with self.lock:
+            delay = self.delay
+        return random.uniform(delay * 0.75, delay * 1.25)
+
+    def concurrency_limit(self) -> int:
+        with self.lock:
+            return int(self.concurrency)
+
+    def merge(self, other: dict):
+        """Add the counters of another process's snapshot (shard workers)"""
+
+        with self.lock:
+            self.loads += other["loads"]
+            self.failures += other["failures"]
+            self.backoffs += other["backoffs"]
+
+            # the slowest worker's pace, not this process's unused start
+            self.delay = other["delay"] if not self.merged else max(self.delay, other["delay"])
+            self.merged += 1
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "delay": round(self.delay, 3),
+                "concurrency": int(self.concurrency),
+                "loads": self.loads,
+                "failures": self.failures,
+                "backoffs": self.backoffs,
+            }
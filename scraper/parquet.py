@@ -0,0 +1,125 @@
+import re
+import json
+
+# ================= PARQUET TYPES =================
+#
+# Column types and value conversion for the Parquet sink
+# (formats.ParquetSink, --format parquet). Rows arrive flattened like
+# every other sink's; they are typed back here: Image 1..N become one
+# list, Star Breakdown a struct and Reviewers a list of structs.
+#
+# pyarrow is optional and only imported when the sink is opened.
+
+STARS = ["5", "4", "3", "2", "1"]
+
+
+def _schema_types(pa):
+
+    text = pa.string()
+    return {
+        "Name":           text,
+        "Category":       text,
+        "Rating":         pa.float64(),
+        "Reviews Count":  pa.int64(),
+        "Address":        text,
+        "Plus Code":      text,
+        "Located In":     text,
+        "Phone":          text,
+        "Website":        text,
+        "Open Status":    text,
+        "Latitude":       pa.float64(),
+        "Longitude":      pa.float64(),
+        "Maps URL":       text,
+        "Images":         pa.list_(text),
+        "Star Breakdown": pa.struct([(s, pa.int64()) for s in STARS]),
+        "Reviewers":      pa.list_(pa.struct([("name", text), ("profile_url", text)])),
+    }
+
+
+# ---------- VALUE CONVERSION ----------
+
+def _text(value):
+    return None if value in (None, "", "N/A") else str(value)
+
+
+def _float(value):
+    try:
+        return float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _mapping(value):
+    # Star Breakdown is flattened to JSON text
+    if isinstance(value, dict):
+        return value
+    try:
+        value = json.loads(value)
+    except (TypeError, ValueError):
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _records(value):
+    # Reviewers are flattened to "name: X, profile_url: Y" lines
+    if isinstance(value, list):
+        return value
+    return [
+        dict(re.findall(r"(\w+): (.*?)(?:, (?=\w+: )|$)", line))
+        for line in str(value or "").splitlines() if line.strip()
+    ]
+
+
+def _star_count(label):
+    # aria-label "5 stars, 1,234 reviews"
+    numbers = re.findall(r"\d[\d,]*", label or "")
+    return int(numbers[-1].replace(",", "")) if len(numbers) > 1 else None
+
+
+CONVERTERS = {
+    "Rating":         _float,
+    "Reviews Count":  _int,
+    "Latitude":       _float,
+    "Longitude":      _float,
+    "Images":         lambda v: [u for u in v or [] if u and u != "N/A"],
+    "Star Breakdown": lambda v: {s: _star_count(_mapping(v).get(s)) for s in STARS},
+    "Reviewers":      lambda v: [
+        {"name": _text(r.get("name")), "profile_url": _text(r.get("profile_url"))}
+        for r in _records(v)
+    ],
+}
+
+
+def parquet_fields(pa, columns) -> list:
+    """Typed fields behind a flat column layout (Image 1..N -> Images)"""
+
+    columns = set(columns)
+    return [
+        f for f in _schema_types(pa)
+        if f in columns or (f == "Images" and "Image 1" in columns)
+    ]
+
+
+def parquet_schema(pa, fields):
+    types = _schema_types(pa)
+    return pa.schema([(f, types[f]) for f in fields])
+
+
+def typed_row(data: dict, fields) -> dict:
+
+    row = {}
+    for f in fields:
+        if f == "Images" and "Images" not in data:
+            value = [v for k, v in data.items() if k.startswith("Image ")]
+        else:
+            value = data.get(f)
+        row[f] = CONVERTERS.get(f, _text)(value)
+
+    return row
@@ -0,0 +1,124 @@
+import os
+import json
+import time
+from openpyxl import load_workbook
+
+from google import fetch_place, throttle
+from utils import place_id
+
+# ================= REFRESH =================
+#
+# Re-visits the Maps URL of rows already in data/<query>.xlsx and reads
+# only the fields that drift over time. When each place was last
+# refreshed and how much it changed are kept in data/<query>.refresh.json
+# so the next run starts with the rows most likely to be out of date.
+
+VOLATILE_FIELDS = ["Rating", "Reviews Count", "Open Status"]
+
+
+def read_rows(path: str):
+    """(place id, Maps URL, {volatile field: value}) for every row with a link"""
+
+    wb = load_workbook(path, read_only=True)
+    rows = wb.active.iter_rows(values_only=True)
+
+    headers = list(next(rows, None) or ())
+    if "Maps URL" not in headers:
+        wb.close()
+        return []
+
+    url_col = headers.index("Maps URL")
+    cols = {f: headers.index(f) for f in VOLATILE_FIELDS if f in headers}
+
+    result = []
+    for row in rows:
+        url = row[url_col] if url_col < len(row) else None
+        pid = place_id(str(url)) if url else ""
+        if pid:
+            result.append((pid, str(url), {f: row[i] for f, i in cols.items()}))
+
+    wb.close()
+    return result
+
+
+def change_score(old: dict, new: dict) -> float:
+
+    # 1 per changed field, plus the relative growth in reviews
+    score = 0.0
+    for f in VOLATILE_FIELDS:
+        if f in old and str(old[f]) != str(new.get(f)):
+            score += 1
+
+    try:
+        before = int(old.get("Reviews Count") or 0)
+        after = int(new.get("Reviews Count") or 0)
+        score += abs(after - before) / max(before, 1)
+    except (TypeError, ValueError):
+        pass
+
+    return round(score, 3)
+
+
+# ================= STATE =================
+
+class RefreshState:
+
+    def __init__(self, path: str, created: float = None):
+
+        self.path = path
+        self.places = {}
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.places = json.load(f)
+
+        # rows never refreshed count as old as the file they came from
+        self.created = created or time.time()
+
+    def prioritise(self, rows, by: str = "age"):
+
+        now = time.time()
+
+        def age(pid):
+            return now - self.places.get(pid, {}).get("at", self.created)
+
+        def change(pid):
+            return self.places.get(pid, {}).get("change", 1.0)
+
+        if by == "change":
+            # most volatile first, age breaks ties
+            return sorted(rows, key=lambda r: (change(r[0]), age(r[0])), reverse=True)
+
+        return sorted(rows, key=lambda r: age(r[0]), reverse=True)
+
+    def mark(self, pid: str, change: float):
+        self.places[pid] = {"at": time.time(), "change": change}
+
+    def save(self):
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.places, f)
+        os.replace(tmp_path, self.path)
+
+
+# ================= SCRAPER =================
+
+def refresh_places(page, rows, state, traffic=None):
+    """Yield (place id, new values, change score) for each refreshed row"""
+
+    for pid, url, old in rows:
+        try:
+            new = fetch_place(page, url, VOLATILE_FIELDS, traffic)
+        except Exception:
+            print(f"\n[refresh] failed {url}")
+            yield pid, None, 0.0
+            continue
+
+        new = {f: new[f] for f in VOLATILE_FIELDS}
+        change = change_score(old, new)
+        state.mark(pid, change)
+
+        yield pid, new, change
+
+        throttle()
@@ -0,0 +1,146 @@
+import multiprocessing as mp
+import queue
+
+from google import (
+    scrape_google_maps,
+    browser_session,
+    reset_pacer,
+    CONFIG,
+    PLACE_LATENCIES,
+    PLACE_BYTES,
+    TRAFFIC,
+    TRAFFIC_LOCK,
+    PACER
+)
+from failures import FailureQueue
+from metrics import export_stages, merge_stages
+
+# ================= SHARDING =================
+#
+# Each worker process owns one Chromium and scrapes its share of the
+# queries. Everything it finds is streamed back over one queue as
+# (kind, worker_id, query, payload) events; the parent is the only writer.
+
+
+class ForwardedFailures(FailureQueue):
+    """In-memory failure queue of a worker, every event is sent to the parent"""
+
+    def __init__(self, out_queue, worker_id, query):
+        super().__init__()
+        self.out_queue = out_queue
+        self.worker_id = worker_id
+        self.query = query
+
+    def _write(self, entry: dict):
+        super()._write(entry)
+        self.out_queue.put(("failure", self.worker_id, self.query, entry))
+
+
+def split_queries(queries, processes):
+    shards = [queries[i::processes] for i in range(processes)]
+    return [shard for shard in shards if shard]
+
+
+def worker_metrics() -> dict:
+    """Run-wide numbers of this process, sent to the parent before done"""
+
+    with TRAFFIC_LOCK:
+        traffic = dict(TRAFFIC)
+
+    return {
+        "stages": export_stages(),
+        "latencies": list(PLACE_LATENCIES),
+        "bytes": list(PLACE_BYTES),
+        "traffic": traffic,
+        "pacer": PACER.snapshot(),
+    }
+
+
+def merge_worker_metrics(payload: dict):
+
+    merge_stages(payload["stages"])
+    PLACE_LATENCIES.extend(payload["latencies"])
+    PLACE_BYTES.extend(payload["bytes"])
+
+    with TRAFFIC_LOCK:
+        for key, value in payload["traffic"].items():
+            TRAFFIC[key] = TRAFFIC.get(key, 0) + value
+
+    PACER.merge(payload["pacer"])
+
+
+def _shard_worker(worker_id, queries, options, config, out_queue):
+
+    # spawned children start with default CONFIG
+    CONFIG.update(config)
+    reset_pacer()
+
+    try:
+        with browser_session() as browser:
+            for query in queries:
+                out_queue.put(("query", worker_id, query, None))
+
+                failures = ForwardedFailures(out_queue, worker_id, query)
+
+                try:
+                    for place in scrape_google_maps(
+                        query, browser=browser, failures=failures, **options
+                    ):
+                        out_queue.put(("place", worker_id, query, place))
+                except Exception as e:
+                    out_queue.put(("failed", worker_id, query, str(e)))
+
+    except Exception as e:
+        out_queue.put(("failed", worker_id, None, str(e)))
+
+    finally:
+        # --stats / --metrics-json of the parent include every worker
+        try:
+            out_queue.put(("metrics", worker_id, None, worker_metrics()))
+        finally:
+            out_queue.put(("done", worker_id, None, None))
+
+
+def scrape_sharded(queries, processes, **options):
+
+    ctx = mp.get_context("spawn")
+    out_queue = ctx.Queue(maxsize=1000)
+
+    procs = [
+        ctx.Process(
+            target=_shard_worker,
+            args=(worker_id, shard, options, dict(CONFIG), out_queue),
+            daemon=True
+        )
+        for worker_id, shard in enumerate(split_queries(queries, processes))
+    ]
+
+    for proc in procs:
+        proc.start()
+
+    running = len(procs)
+
+    try:
+        while running:
+            try:
+                event = out_queue.get(timeout=1)
+            except queue.Empty:
+                if not any(proc.is_alive() for proc in procs):
+                    break
+                continue
+
+            if event[0] == "metrics":
+                merge_worker_metrics(event[3])
+                continue
+
+            if event[0] == "done":
+                running -= 1
+
+            yield event
+
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+        for proc in procs:
+            proc.join(timeout=5)
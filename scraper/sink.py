@@ -0,0 +1,60 @@
+from abc import ABC, abstractmethod
+
+# ================= SINK INTERFACE =================
+#
+# Every output backend (Excel, journal, place store, CSV, JSONL, SQLite,
+# Parquet)
+# implements the same four calls:
+#   open()             -> load whatever is needed to answer seen()
+#   seen(row)          -> True if the row is already stored
+#   write_batch(rows)  -> store rows in one bulk operation, returns how many
+#   close()            -> flush and release files
+# write_row() is the one-row convenience used by the scrape loop, and
+# set_columns() fixes the column layout up front (see utils.RowSchema).
+
+
+class Sink(ABC):
+
+    path = None
+    shared_ids = None
+
+    def __init__(self):
+        # per instance: a class level list would be shared by every sink
+        self.headers = []
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def open(self):
+        return self
+
+    def set_columns(self, columns):
+        pass
+
+    @abstractmethod
+    def seen(self, data: dict) -> bool:
+        """True if the row is already stored"""
+
+    @abstractmethod
+    def write_batch(self, rows) -> int:
+        """Store rows in one bulk operation, returns how many were new"""
+
+    def write_row(self, data: dict) -> bool:
+
+        if not data.get("Name") or not data.get("Address") or self.seen(data):
+            return False
+
+        return self.write_batch([data]) == 1
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def get_row_count(self) -> int:
+        return 0
@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from openpyxl import Workbook, load_workbook
+from excel import sanitize_name, make_place_key
+from utils import place_id
+from sink import Sink
+
+# ================= PLACE STORE =================
+#
+# One SQLite database (data/places.db, WAL mode) shared by every query.
+# Places are keyed by their canonical Maps place id and remember when
+# they were last scraped; query_places records which queries found them.
+# The per-query .xlsx files are exports of this store; exports remembers
+# the signature of each file written, so rows a run without --store
+# added to it later are imported before it is overwritten.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    place_id   TEXT PRIMARY KEY,
+    data       TEXT NOT NULL,
+    scraped_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS query_places (
+    query    TEXT NOT NULL,
+    place_id TEXT NOT NULL,
+    found_at REAL NOT NULL,
+    PRIMARY KEY (query, place_id)
+);
+CREATE TABLE IF NOT EXISTS exports (
+    query    TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL
+);
+"""
+
+
+def row_place_id(data: dict) -> str:
+    # rows without a usable Maps link fall back to name + address
+    pid = place_id(data.get("Maps URL") or "")
+    if pid:
+        return pid
+    return "key:" + make_place_key(data["Name"], data["Address"])
+
+
+class PlaceStore:
+
+    def __init__(self, path: str = "data/places.db", ttl_days: float = None):
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.path = path
+        self.ttl = ttl_days * 86400 if ttl_days else None
+
+        # the async engine checks ids from its event loop thread
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _fresh_after(self) -> float:
+        return time.time() - self.ttl if self.ttl else 0.0
+
+    def is_fresh(self, pid: str) -> bool:
+
+        with self.lock:
+            row = self.db.execute(
+                "SELECT scraped_at FROM places WHERE place_id = ?", (pid,)
+            ).fetchone()
+
+        return row is not None and row[0] >= self._fresh_after()
+
+    def has(self, pid: str) -> bool:
+
+        with self.lock:
+            return self.db.execute(
+                "SELECT 1 FROM places WHERE place_id = ?", (pid,)
+            ).fetchone() is not None
+
+    def link(self, query: str, pid: str, found_at: float = None):
+
+        with self.lock:
+            self.db.execute(
+                "INSERT OR IGNORE INTO query_places VALUES (?, ?, ?)",
+                (query, pid, found_at or time.time())
+            )
+            self.db.commit()
+
+    def upsert(self, query: str, data: dict, scraped_at: float = None) -> bool:
+        """Store a row; False if the place is already known and fresh"""
+
+        pid = row_place_id(data)
+        if self.is_fresh(pid):
+            self.link(query, pid)
+            return False
+
+        now = scraped_at or time.time()
+
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO places VALUES (?, ?, ?)",
+                (pid, json.dumps(data, ensure_ascii=False, default=str), now)
+            )
+            self.db.execute(
+                "INSERT OR IGNORE INTO query_places VALUES (?, ?, ?)",
+                (query, pid, now)
+            )
+            self.db.commit()
+
+        return True
+
+    def update(self, pid: str, values: dict) -> bool:
+        """Overwrite some columns of a stored place; False if unknown"""
+
+        with self.lock:
+            row = self.db.execute(
+                "SELECT data FROM places WHERE place_id = ?", (pid,)
+            ).fetchone()
+            if row is None:
+                return False
+
+            data = json.loads(row[0])
+            data.update(values)
+            self.db.execute(
+                "UPDATE places SET data = ? WHERE place_id = ?",
+                (json.dumps(data, ensure_ascii=False, default=str), pid)
+            )
+            self.db.commit()
+
+        return True
+
+    def query_count(self, query: str) -> int:
+
+        with self.lock:
+            return self.db.execute(
+                "SELECT COUNT(*) FROM query_places WHERE query = ?", (query,)
+            ).fetchone()[0]
+
+    def iter_query(self, query: str):
+
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT p.data FROM query_places q "
+                "JOIN places p ON p.place_id = q.place_id "
+                "WHERE q.query = ? ORDER BY q.found_at, q.rowid",
+                (query,)
+            ).fetchall()
+
+        for (data,) in rows:
+            yield json.loads(data)
+
+    def export(self, query: str, path: str) -> str:
+
+        # headers in first-seen order, then one write-only pass
+        headers = []
+        for data in self.iter_query(query):
+            for k in data.keys():
+                if k not in headers:
+                    headers.append(k)
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Places")
+        ws.append(headers)
+
+        for data in self.iter_query(query):
+            ws.append([data.get(h, "") for h in headers])
+
+        tmp_path = path + ".tmp"
+        wb.save(tmp_path)
+        os.replace(tmp_path, path)
+
+        st = os.stat(path)
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO exports VALUES (?, ?, ?)",
+                (query, st.st_mtime_ns, st.st_size)
+            )
+            self.db.commit()
+
+        return path
+
+    def exported_unchanged(self, query: str, path: str) -> bool:
+        """True if path is still the file export() last wrote for query"""
+
+        with self.lock:
+            row = self.db.execute(
+                "SELECT mtime_ns, size FROM exports WHERE query = ?", (query,)
+            ).fetchone()
+
+        st = os.stat(path)
+        return row is not None and tuple(row) == (st.st_mtime_ns, st.st_size)
+
+    def writer(self, search_query: str, base_folder: str = "data") -> "StoreWriter":
+        return StoreWriter(self, search_query, base_folder)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+# ================= STORE WRITER =================
+
+class KnownPlaces:
+    """Fresh places in the store, as seen by one query's scraper"""
+
+    def __init__(self, store: PlaceStore, query: str):
+        self.store = store
+        self.query = query
+
+    def __contains__(self, pid) -> bool:
+        # a hit is linked to this query so the export still lists it
+        if self.store.is_fresh(pid):
+            self.store.link(self.query, pid)
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return self.store.query_count(self.query)
+
+    def __bool__(self) -> bool:
+        return True
+
+
+class StoreWriter(Sink):
+    """Writer facade over PlaceStore; data/<query>.xlsx is exported on close"""
+
+    def __init__(self, store: PlaceStore, search_query: str, base_folder: str = "data"):
+
+        os.makedirs(base_folder, exist_ok=True)
+
+        self.store = store
+        self.query = sanitize_name(search_query)
+        self.path = os.path.join(base_folder, f"{self.query}.xlsx")
+
+        self.headers = []
+        self.shared_ids = None
+        self.seen_ids = KnownPlaces(store, self.query)
+
+        # an .xlsx from before the store existed, or one a plain run
+        # added rows to since the last export, is merged in first,
+        # otherwise the export would drop those rows
+        if os.path.exists(self.path) and not store.exported_unchanged(self.query, self.path):
+            self._import_workbook()
+
+        self.rows = store.query_count(self.query)
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _import_workbook(self):
+
+        scraped_at = os.path.getmtime(self.path)
+
+        wb = load_workbook(self.path, read_only=True)
+        headers = None
+
+        for row in wb.active.iter_rows(values_only=True):
+            if headers is None:
+                headers = [h for h in row if h]
+                continue
+
+            data = {h: ("" if v is None else v) for h, v in zip(headers, row)}
+            if not data.get("Name") or not data.get("Address"):
+                continue
+
+            # places the store has are only linked, never overwritten
+            pid = row_place_id(data)
+            if self.store.has(pid):
+                self.store.link(self.query, pid, scraped_at)
+            else:
+                self.store.upsert(self.query, data, scraped_at)
+
+        wb.close()
+
+    def seen(self, data: dict) -> bool:
+        return self.store.is_fresh(row_place_id(data))
+
+    def write_batch(self, rows) -> int:
+        return sum(self.write_row(data) for data in rows)
+
+    def write_row(self, data: dict) -> bool:
+
+        if not data.get("Name") or not data.get("Address"):
+            return False
+
+        if not self.store.upsert(self.query, data):
+            return False
+
+        # a stale place that was re-scraped is already linked
+        self.rows = self.store.query_count(self.query)
+        return True
+
+    def update_rows(self, updates: dict) -> int:
+        """Overwrite cells of stored places, updates = {place id: {column: value}}"""
+        return sum(self.store.update(pid, values) for pid, values in updates.items())
+
+    def compact(self) -> str:
+        return self.store.export(self.query, self.path)
+
+    def close(self):
+
+        if self.closed:
+            return
+
+        self.closed = True
+        self.compact()
+
+    def get_row_count(self) -> int:
+        return self.rows
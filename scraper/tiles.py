@@ -0,0 +1,177 @@
+import os
+import json
+import math
+from urllib.parse import quote_plus
+
+from google import scrape_google_maps, scrape_leftovers, SearchFailed, CONFIG
+
+# ================= TILING =================
+#
+# A bounding box (south, west, north, east) is cut into a grid; every
+# tile is searched at its own @lat,lng,zoom viewport. Tiles whose list
+# was cut off (no end-of-list footer, or TILE_CAP results) are split
+# into four quadrants, down to MAX_TILE_DEPTH. Finished tiles are kept
+# in data/<query>.tiles.json so re-runs only visit what is missing.
+
+def parse_bbox(text: str):
+
+    parts = [float(p) for p in text.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox needs south,west,north,east")
+
+    south, west, north, east = parts
+    if south >= north or west >= east:
+        raise ValueError("bbox must satisfy south < north and west < east")
+
+    return south, west, north, east
+
+
+def split_grid(bbox, n: int):
+
+    south, west, north, east = bbox
+    lat_step = (north - south) / n
+    lng_step = (east - west) / n
+
+    return [
+        (
+            south + r * lat_step,
+            west + c * lng_step,
+            south + (r + 1) * lat_step,
+            west + (c + 1) * lng_step,
+        )
+        for r in range(n)
+        for c in range(n)
+    ]
+
+
+def quadrants(tile):
+    return split_grid(tile, 2)
+
+
+def tile_key(tile) -> str:
+    return ",".join(f"{v:.6f}" for v in tile)
+
+
+def tile_zoom(tile) -> int:
+
+    # zoom at which the tile's width fills the browser viewport
+    south, west, north, east = tile
+    span = max(east - west, 1e-6)
+    zoom = math.log2(360 * CONFIG["VIEWPORT_WIDTH"] / (256 * span))
+    return max(3, min(21, int(zoom)))
+
+
+def tile_url(search_query: str, tile) -> str:
+
+    south, west, north, east = tile
+    lat = (south + north) / 2
+    lng = (west + east) / 2
+
+    return (
+        "https://www.google.com/maps/search/"
+        f"{quote_plus(search_query)}/@{lat:.6f},{lng:.6f},{tile_zoom(tile)}z"
+    )
+
+
+# ================= STATE =================
+
+class TileState:
+
+    def __init__(self, path: str):
+
+        self.path = path
+        self.tiles = {}
+
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.tiles = json.load(f)
+
+    def status(self, tile):
+        return self.tiles.get(tile_key(tile))
+
+    def mark(self, tile, status: str):
+
+        self.tiles[tile_key(tile)] = status
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.tiles, f)
+        os.replace(tmp_path, self.path)
+
+
+# ================= SCRAPER =================
+
+def scrape_tiles(
+    search_query,
+    bbox,
+    grid=2,
+    max_depth=None,
+    state=None,
+    on_tile=None,
+    **options
+):
+    """Yield places for every tile of bbox, splitting capped tiles"""
+
+    if max_depth is None:
+        max_depth = CONFIG["MAX_TILE_DEPTH"]
+
+    stack = [(tile, 0) for tile in reversed(split_grid(bbox, grid))]
+
+    while stack:
+        tile, depth = stack.pop()
+        status = state.status(tile) if state else None
+
+        if status == "done":
+            continue
+
+        if status == "split":
+            stack.extend((q, depth + 1) for q in reversed(quadrants(tile)))
+            continue
+
+        if on_tile:
+            on_tile(tile, depth, len(stack))
+
+        info = {}
+        try:
+            for place in scrape_google_maps(
+                search_query,
+                start_url=tile_url(search_query, tile),
+                info=info,
+                search_retries=0,
+                retry_rounds=0,
+                resume=False,
+                **options
+            ):
+                yield place
+        except SearchFailed:
+            print(f"\n[tile] {tile_key(tile)} shows no result list")
+
+            # an empty tile never shows a result list; a tile that broke
+            # half way stays unmarked so the next run visits it again
+            if info.get("cards"):
+                continue
+        except Exception as e:
+            # browser / network errors say nothing about the tile, it
+            # stays unmarked for the next run
+            print(f"\n[tile] {tile_key(tile)} stopped ({type(e).__name__}: {e})")
+            continue
+
+        capped = not info.get("end_reached") or info.get("cards", 0) >= CONFIG["TILE_CAP"]
+
+        if capped and info.get("cards") and depth < max_depth:
+            if state:
+                state.mark(tile, "split")
+            stack.extend((q, depth + 1) for q in reversed(quadrants(tile)))
+        elif state:
+            state.mark(tile, "done")
+
+    # once for the whole bbox, not after every tile
+    if options.get("frontier") is not None or options.get("failures") is not None:
+        yield from scrape_leftovers(
+            options.get("frontier") if options.get("two_phase") else None,
+            options.get("failures"),
+            options.get("fields"),
+            options.get("known_ids"),
+            browser=options.get("browser"),
+            page=options.get("page")
+        )
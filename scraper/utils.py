@@ -1,4 +1,27 @@
 import json
+import re
+
+
+def flatten_value(value):
+
+    # ================= LIST =================
+    if isinstance(value, list):
+
+        # list of dicts (e.g. reviewers)
+        if value and isinstance(value[0], dict):
+            return "\n".join(
+                ", ".join(f"{k}: {v}" for k, v in item.items())
+                for item in value
+            )
+
+        return "\n".join(map(str, value))
+
+    # ================= DICT =================
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False, indent=2)
+
+    # ================= SCALAR =================
+    return value
 
 
 def flatten_for_excel(place: dict, max_images: int = 20) -> dict:
@@ -13,26 +36,81 @@ def flatten_for_excel(place: dict, max_images: int = 20) -> dict:
                 flat[f"Image {i + 1}"] = value[i] if i < len(value) else ""
             continue
 
-        # ================= LIST =================
-        if isinstance(value, list):
+        flat[key] = flatten_value(value)
 
-            # list of dicts (e.g. reviewers)
-            if value and isinstance(value[0], dict):
-                flat[key] = "\n".join(
-                    ", ".join(f"{k}: {v}" for k, v in item.items())
-                    for item in value
-                )
-            else:
-                flat[key] = "\n".join(map(str, value))
+    return flat
 
-            continue
 
-        # ================= DICT =================
-        if isinstance(value, dict):
-            flat[key] = json.dumps(value, ensure_ascii=False, indent=2)
-            continue
+def output_columns(fields, max_images: int = 20) -> list:
+    """Column layout for fields (in that order), Images as Image 1..N"""
 
-        # ================= SCALAR =================
-        flat[key] = value
+    columns = []
+    for f in fields:
+        if f == "Images":
+            columns.extend(f"Image {i + 1}" for i in range(max_images))
+        else:
+            columns.append(f)
 
-    return flat
+    return columns
+
+
+class RowSchema:
+    """Fixed output columns; places are flattened straight into position"""
+
+    def __init__(self, fields, max_images: int = 20):
+
+        self.max_images = max_images
+        self.columns = output_columns(fields, max_images)
+        self.index = {c: i for i, c in enumerate(self.columns)}
+        self.image_start = self.index.get("Image 1")
+
+    def row(self, place: dict) -> list:
+
+        row = [""] * len(self.columns)
+
+        for key, value in place.items():
+            if key == "Images":
+                if self.image_start is not None and isinstance(value, list):
+                    images = value[:self.max_images]
+                    row[self.image_start:self.image_start + len(images)] = images
+                continue
+
+            i = self.index.get(key)
+            if i is not None:
+                row[i] = flatten_value(value)
+
+        return row
+
+    def record(self, place: dict) -> dict:
+        # keys in column order, so writers can take the values positionally
+        return dict(zip(self.columns, self.row(place)))
+
+
+def repair_tail(path: str):
+    """Drop a half-written last line (left by a killed process)"""
+
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def place_id(url: str) -> str:
+    """Canonical identity of a Maps place link (card href or page URL)"""
+
+    if not url:
+        return ""
+
+    # feature id "0x<cell>:0x<cid>"; the cid alone is what ?cid= links use
+    m = re.search(r'!1s0x[0-9a-f]+:0x([0-9a-f]+)', url)
+    if m:
+        return f"cid:{int(m.group(1), 16)}"
+
+    m = re.search(r'[?&](?:cid|ludocid)=(\d+)', url)
+    if m:
+        return f"cid:{int(m.group(1))}"
+
+    # otherwise /maps/place/<name> without viewport, data and params
+    path = url.split("?", 1)[0]
+    path = re.split(r'/(?:@|data=)', path, maxsplit=1)[0]
+    return path.rstrip("/").lower()